@@ -0,0 +1,53 @@
+"""Import-time benchmark: `import srs` has to stay under a fixed budget
+and must not load pyvisa or NumPy.
+
+Usage:
+    python benchmarks/import_time.py [--budget SECONDS] [--runs N]
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SNIPPET = """
+import sys, time
+t = time.perf_counter()
+import srs
+t = time.perf_counter() - t
+print(t, ','.join(m for m in ('pyvisa', 'numpy', 'h5py') if m in sys.modules))
+"""
+
+
+def measure(runs):
+    """Import srs in fresh interpreters.
+
+    Returns:
+        tuple: best import time in second, str of heavy modules loaded
+    """
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, (ROOT, os.environ.get('PYTHONPATH')))))
+    best, loaded = float('inf'), ''
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', SNIPPET], env=env, check=True,
+                             capture_output=True, text=True).stdout.split()
+        best = min(best, float(out[0]))
+        loaded = out[1] if len(out) > 1 else ''
+    return best, loaded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=0.02, help='import time budget in s')
+    parser.add_argument('--runs', type=int, default=5, help='number of fresh interpreters')
+    args = parser.parse_args()
+
+    best, loaded = measure(args.runs)
+    print('import srs: {:.1f} ms (budget {:.1f} ms)'.format(best * 1e3, args.budget * 1e3))
+    if loaded:
+        print('heavy modules loaded at import: {}'.format(loaded))
+    return 0 if best <= args.budget and not loaded else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
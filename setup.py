@@ -17,7 +17,17 @@ setup(
     packages=find_packages(exclude=['examples']),
     install_requires=[
         'pyvisa',
+        'numpy',
     ],
+    extras_require={
+        'hdf5': ['h5py'],
+    },
+    entry_points={
+        'console_scripts': [
+            'sr860-log = srs.cli:main',
+            'sr860-batch = srs.batch:main',
+        ],
+    },
     classifiers=[
         'Programming Language :: Python :: 3',
         'License :: OSI Approved :: MIT License',
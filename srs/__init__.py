@@ -2,4 +2,27 @@
 
 __version__ = '0.1.0'
 
-from .sr860 import SR860
\ No newline at end of file
+# Public names are imported on first use, so `import srs` stays fast and
+# does not load pyvisa or NumPy until they are needed.
+_lazy = {
+    'SR860': '.sr860',
+    'CommandError': '.instr',
+    'CaptureOverrun': '.sr860',
+    'SampleWriter': '.writer',
+    'profile_bus': '.profiling',
+}
+
+__all__ = list(_lazy)
+
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    import importlib
+    value = getattr(importlib.import_module(_lazy[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,214 @@
+"""sr860-batch: summarize archived SampleWriter files in parallel.
+
+Usage:
+    sr860-batch FILE [FILE ...] [--workers N] [--chunk-rows ROWS]
+                [--nperseg N] [--rate HZ] [--config CONFIG] [--normalized]
+                [--output FILE]
+
+Every file is split into chunks of rows processed on a process pool. Each
+worker memory-maps its file and reads only its own chunk, so no sample
+arrays are sent between processes. Chunks are calibrated with
+srs.processing.calibrate() using the settings stored as file attributes,
+and their statistics and noise spectra are merged into one summary per
+file, printed as one JSON object per line.
+"""
+import argparse
+import concurrent.futures
+import json
+import os
+import sys
+
+import numpy as np
+
+from .processing import COLUMNS, calibrate
+from .spectrum import WelchPSD
+from .statistics import RunningStats
+
+# capture configurations by channel names
+_configs = {('X',): 'X', ('X', 'Y'): 'XY', ('R', 'theta'): 'RT', ('X', 'Y', 'R', 'theta'): 'XYRT'}
+
+
+def open_archive(path):
+    """Open a file written by SampleWriter without reading the samples.
+
+    Args:
+        path (str): .npy, .h5 or .hdf5 file
+
+    Returns:
+        tuple: (rows, channels) memory-mapped array or HDF5 dataset, dict of
+            attributes, and the HDF5 file to close (None for .npy files)
+    """
+    if path.endswith('.npy'):
+        data = np.load(path, mmap_mode='r')
+        attrs, rows = {}, len(data)
+        if os.path.exists(path + '.json'):
+            with open(path + '.json') as f:
+                sidecar = json.load(f)
+            attrs, rows = sidecar['attrs'], sidecar['rows']
+        return data[:rows], attrs, None
+    if path.endswith(('.h5', '.hdf5')):
+        import h5py
+        f = h5py.File(path, 'r')
+        data = f['data']
+        return data, dict(data.attrs), f
+    raise ValueError('Expected file extension in set: {}.'.format(('.npy', '.h5', '.hdf5')))
+
+
+def _layout(attrs, channels, config=None):
+    """Index of the time column (or None) and capture configuration."""
+    columns = attrs.get('columns')
+    if columns is None:
+        if config is None:
+            config = {1: 'X', 2: 'XY', 4: 'XYRT'}.get(channels)
+        if config is None or len(config) != channels:
+            raise ValueError('Cannot infer the channels of {} columns, pass config.'.format(channels))
+        return None, config
+    columns = tuple(columns.split(','))
+    time_column = columns.index('time') if 'time' in columns else None
+    names = tuple(c for c in columns if c != 'time')
+    if names not in _configs:
+        raise ValueError('Unsupported columns: {}.'.format(attrs['columns']))
+    return time_column, _configs[names]
+
+
+def _sample_rate(data, time_column):
+    """Mean sample rate from the time column."""
+    if time_column is None or len(data) < 2:
+        return None
+    span = float(data[len(data) - 1, time_column]) - float(data[0, time_column])
+    return (len(data) - 1) / span if span > 0 else None
+
+
+def process_chunk(path, start, stop, config=None, nperseg=1024, fs=None, normalized=False):
+    """Calibrate a chunk of a file and get its statistics and spectrum.
+    Runs in a worker process.
+
+    Args:
+        path (str): archive file
+        start (int): first row
+        stop (int): end row
+        config (str): capture configuration if not stored in the file
+        nperseg (int): PSD segment length in samples
+        fs (float): sample rate in Hz, no PSD if None
+        normalized (bool): raw X, Y, R are fractions of full scale
+
+    Returns:
+        tuple: RunningStats and WelchPSD (or None) of X, Y, R, theta
+    """
+    data, attrs, f = open_archive(path)
+    try:
+        time_column, config = _layout(attrs, data.shape[1], config)
+        block = np.asarray(data[start:stop])
+    finally:
+        if f is not None:
+            f.close()
+    if time_column is not None:
+        block = np.delete(block, time_column, axis=1)
+    values = calibrate(block, attrs, config, normalized)
+
+    stats = RunningStats(len(COLUMNS))
+    stats.update(values)
+    psd = None
+    if fs is not None and len(values) >= nperseg:
+        psd = WelchPSD(fs, nperseg)
+        psd.update(values)
+    return stats, psd
+
+
+def process_files(paths, workers=None, chunk_rows=1048576, nperseg=1024, fs=None, config=None,
+                  normalized=False):
+    """Summarize files on a process pool, split by file and chunk.
+
+    Args:
+        paths (list): archive files written by SampleWriter
+        workers (int): number of processes, defaults to the number of CPUs
+        chunk_rows (int): rows per chunk, rounded to a multiple of nperseg.
+            PSD segments spanning two chunks are skipped.
+        nperseg (int): PSD segment length in samples
+        fs (float): sample rate in Hz, defaults to the rate of the time
+            column of each file (no PSD without either)
+        config (str): capture configuration of files without a columns
+            attribute
+        normalized (bool): raw X, Y, R are fractions of full scale
+
+    Returns:
+        dict: summary per path: rows, sample rate, and per channel (X, Y,
+            R, theta) mean, standard deviation, standard error and mean
+            noise density over all bins above DC, or None for channels not
+            in the file
+    """
+    chunk_rows = max(chunk_rows // nperseg, 1) * nperseg
+    results, rates, measured = {}, {}, {}
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = {}
+        for path in paths:
+            data, attrs, f = open_archive(path)
+            try:
+                rows = len(data)
+                time_column, file_config = _layout(attrs, data.shape[1], config)
+                rates[path] = fs if fs is not None else _sample_rate(data, time_column)
+                # calibrate() fills channels it cannot derive with NaN
+                measured[path] = ('X',) if file_config == 'X' else COLUMNS
+            finally:
+                if f is not None:
+                    f.close()
+            results[path] = [RunningStats(len(COLUMNS)), None]
+            for start in range(0, rows, chunk_rows):
+                future = pool.submit(process_chunk, path, start, min(start + chunk_rows, rows),
+                                     config, nperseg, rates[path], normalized)
+                futures[future] = path
+
+        for future in concurrent.futures.as_completed(futures):
+            stats, psd = future.result()
+            total = results[futures[future]]
+            total[0].merge(stats)
+            if psd is not None and psd.segments:
+                if total[1] is None:
+                    total[1] = psd
+                else:
+                    total[1].merge(psd)
+
+    summaries = {}
+    for path, (stats, psd) in results.items():
+        summary = {'rows': stats.count, 'rate': rates[path]}
+        for i, name in enumerate(COLUMNS):
+            if name not in measured[path]:
+                summary[name] = None
+                continue
+            summary[name] = {
+                'mean': float(stats.mean[i]),
+                'std': float(stats.std[i]) if stats.count > 1 else None,
+                'standard_error': float(stats.standard_error[i]) if stats.count > 1 else None,
+                'noise_density': float(psd.noise_floor()[i]) if psd is not None else None,
+                }
+        summaries[path] = summary
+    return summaries
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sr860-batch', description=__doc__.splitlines()[0])
+    parser.add_argument('files', nargs='+', help='.npy, .h5 or .hdf5 files written by SampleWriter')
+    parser.add_argument('--workers', type=int, help='number of processes, defaults to the number of CPUs')
+    parser.add_argument('--chunk-rows', type=int, default=1048576, help='rows per chunk')
+    parser.add_argument('--nperseg', type=int, default=1024, help='PSD segment length in samples')
+    parser.add_argument('--rate', type=float, help='sample rate in Hz, defaults to the time column')
+    parser.add_argument('--config', choices=tuple(_configs.values()),
+                        help='channels of files without a columns attribute')
+    parser.add_argument('--normalized', action='store_true', help='raw X, Y, R are fractions of full scale')
+    parser.add_argument('--output', help='JSON lines output file, defaults to stdout')
+    args = parser.parse_args(argv)
+
+    summaries = process_files(args.files, args.workers, args.chunk_rows, args.nperseg, args.rate,
+                              args.config, args.normalized)
+    out = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for path, summary in summaries.items():
+            out.write(json.dumps(dict(summary, path=path)) + '\n')
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import numpy as np
+
+
+class RingBuffer:
+    """Fixed-capacity ring buffer of rows backed by a preallocated array.
+
+    Appending overwrites the oldest row once the buffer is full. The total
+    number of rows ever appended is kept in count, so consumers can fetch
+    only what is new with since().
+    """
+
+    def __init__(self, capacity, width, dtype='float64'):
+        """
+        Args:
+            capacity (int): number of rows
+            width (int): number of columns
+            dtype (str): data type
+        """
+        self._data = np.zeros((capacity, width), dtype)
+        self._capacity = capacity
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self._capacity)
+
+    @property
+    def capacity(self):
+        """Get number of rows the buffer can hold.
+
+        Returns:
+            int: capacity
+        """
+        return self._capacity
+
+    def append(self, row):
+        """Append a row, overwriting the oldest one if full.
+
+        Args:
+            row (array_like): row of width values
+        """
+        self._data[self.count % self._capacity] = row
+        self.count += 1
+
+    def extend(self, rows):
+        """Append a block of rows.
+
+        Args:
+            rows (array_like): (n, width) rows
+        """
+        rows = np.asarray(rows)
+        total = len(rows)
+        # only the last capacity rows are held, but all count
+        rows = rows[-self._capacity:]
+        start = (self.count + total - len(rows)) % self._capacity
+        n = min(len(rows), self._capacity - start)
+        self._data[start:start + n] = rows[:n]
+        self._data[:len(rows) - n] = rows[n:]
+        self.count += total
+
+    def latest(self, n=None):
+        """Get a copy of the most recent rows, oldest first.
+
+        Args:
+            n (int): number of rows, defaults to all rows held
+
+        Returns:
+            numpy.ndarray: (n, width) rows
+        """
+        n = len(self) if n is None else min(n, len(self))
+        index = np.arange(self.count - n, self.count) % self._capacity
+        return self._data[index]
+
+    def since(self, count, end=None):
+        """Get a copy of the rows appended after a previous count.
+        Rows that have already been overwritten are skipped.
+
+        Args:
+            count (int): previous value of count
+            end (int): value of count up to which rows are returned,
+                defaults to the current count. Pass a snapshot of count
+                when another thread is appending.
+
+        Returns:
+            numpy.ndarray: (n, width) rows, oldest first
+        """
+        end = self.count if end is None else end
+        start = max(count, end - self._capacity)
+        return self._data[np.arange(start, end) % self._capacity]
+
+
+class ByteArena:
+    """Preallocated arena of fixed-size slots for raw text responses.
+
+    append() only copies the response bytes into the next slot, so a poll
+    loop does no parsing. parse() converts all held responses of comma
+    separated numbers to a float64 array in one vectorized pass. Like
+    RingBuffer, the oldest responses are overwritten once the arena is full.
+    """
+
+    def __init__(self, capacity, slot=96):
+        """
+        Args:
+            capacity (int): number of responses
+            slot (int): maximum response length in bytes, including termination
+        """
+        self._buffer = np.zeros((capacity, slot), dtype=np.uint8)
+        self._view = memoryview(self._buffer).cast('B')
+        self._lengths = np.zeros(capacity, dtype=np.intp)
+        self._capacity = capacity
+        self._slot = slot
+        self.count = 0
+
+    def __len__(self):
+        return min(self.count, self._capacity)
+
+    def append(self, data):
+        """Copy a response into the next slot.
+
+        Args:
+            data (bytes): comma separated numbers, optionally newline terminated
+
+        Raises:
+            ValueError: If the response does not fit a slot.
+        """
+        n = len(data)
+        if n >= self._slot:
+            raise ValueError('Response of {} bytes exceeds slot size.'.format(n))
+        i = self.count % self._capacity
+        start = i * self._slot
+        self._view[start:start + n] = data
+        # every response ends with a newline separator
+        if not data.endswith(b'\n'):
+            self._view[start + n] = 10
+            n += 1
+        self._lengths[i] = n
+        self.count += 1
+
+    def parse(self, columns):
+        """Parse all held responses, oldest first.
+
+        Args:
+            columns (int): number of values per response
+
+        Returns:
+            numpy.ndarray: (n, columns) float64 values
+        """
+        n = len(self)
+        if not n:
+            return np.empty((0, columns))
+        order = np.arange(self.count - n, self.count) % self._capacity
+        lengths = self._lengths[order]
+        text = self._buffer[order][np.arange(self._slot) < lengths[:, np.newaxis]]
+        text[text == ord('\n')] = ord(',')
+        values = np.fromstring(text[:-1].tobytes().decode('ascii'), sep=',')
+        if values.size != n * columns:
+            raise ValueError('Expected {} values per response.'.format(columns))
+        return values.reshape(n, columns)
@@ -0,0 +1,155 @@
+"""sr860-log: log time stamped X, Y, R, theta of an SR860 to a file.
+
+Usage:
+    sr860-log RESOURCE OUTPUT [--config FILE] [--rate HZ] [--mode MODE]
+              [--duration S] [--capacity ROWS] [--stats-interval S]
+
+The data is written as rows of time (s, epoch), X, Y, R, theta to an HDF5
+(.h5) or memory-mapped .npy file by srs.SampleWriter, with the instrument
+settings as attributes. Runs until the duration has elapsed or SIGINT /
+SIGTERM is received.
+"""
+import argparse
+import json
+import signal
+import sys
+import threading
+import time
+
+COLUMNS = ('time', 'X', 'Y', 'R', 'theta')
+
+
+def apply_config(lia, path):
+    """Apply a JSON config file of property names and values, in file order,
+    e.g. {"time_constant": 0.1, "sensitivity": 0.01}.
+
+    Args:
+        lia (SR860): lock-in amplifier
+        path (str): config file path
+    """
+    with open(path) as f:
+        config = json.load(f)
+    if not isinstance(config, dict):
+        raise ValueError('Expected a JSON object of property names and values.')
+    for name, value in config.items():
+        if not isinstance(getattr(type(lia), name, None), property):
+            raise ValueError('Unknown property: {}.'.format(name))
+        setattr(lia, name, value)
+
+
+class _Stats:
+    """Periodic rate and drop report on stderr."""
+
+    def __init__(self, interval):
+        self._interval = interval
+        self._start = self._last = time.monotonic()
+        self.rows = 0
+        self.dropped = 0
+
+    def update(self, rows, force=False):
+        self.rows += rows
+        now = time.monotonic()
+        if force or now - self._last >= self._interval:
+            self._last = now
+            print('{} rows, {:.1f} Hz, {} dropped'.format(
+                self.rows, self.rows / max(now - self._start, 1e-9), self.dropped), file=sys.stderr)
+
+
+def log_capture(lia, writer, rate, stop, stats):
+    """Log by continuous capture, sample times from the capture rate."""
+    import numpy as np
+    from .sr860 import CaptureOverrun
+
+    rates = lia.capture_rates
+    # slowest capture rate at or above the requested rate
+    rate = min((r for r in rates if r >= rate), default=rates[0])
+    end = None
+    while not stop.is_set():
+        t0, n = None, 0
+        stream = lia.capture_stream(config='XYRT', rate=rate)
+        try:
+            for block in stream:
+                if t0 is None:
+                    # the capture is configured and started by the generator
+                    t0 = lia.capture_started
+                    if end is not None:
+                        # samples lost between the overrun and the restart
+                        stats.dropped += max(int((t0 - end) * rate), 0)
+                t = t0 + (n + np.arange(len(block))) / rate
+                writer.append(np.column_stack((t, block)))
+                n += len(block)
+                stats.update(len(block))
+                if stop.is_set():
+                    break
+        except CaptureOverrun as e:
+            # buffer overrun, restart the capture
+            print(e, file=sys.stderr)
+            end = lia.capture_started + n / rate
+        finally:
+            stream.close()
+
+
+def log_poll(lia, writer, rate, stop, stats):
+    """Log by polling the XYRP snapshot at a fixed rate."""
+    poller = lia.poller(rate, capacity=max(int(10 * rate), 1000))
+    samples = poller.samples
+    count = 0
+    with poller:
+        while not stop.wait(0.25):
+            end = samples.count
+            block = samples.since(count, end)
+            stats.dropped += end - count - len(block)
+            count = end
+            # drop the latency column
+            writer.append(block[:, [0, 2, 3, 4, 5]])
+            stats.update(len(block))
+    block = samples.since(count)
+    stats.dropped += samples.count - count - len(block)
+    writer.append(block[:, [0, 2, 3, 4, 5]])
+    stats.update(len(block))
+    print('missed poll deadlines: {}'.format(poller.missed), file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='sr860-log', description=__doc__.splitlines()[0])
+    parser.add_argument('resource', help='VISA resource string, e.g. TCPIP0::192.168.1.2::inst0::INSTR')
+    parser.add_argument('output', help='output file (.h5, .hdf5 or .npy)')
+    parser.add_argument('--config', help='JSON file of property names and values to apply')
+    parser.add_argument('--rate', type=float, default=100., help='sample rate in Hz')
+    parser.add_argument('--mode', choices=('auto', 'capture', 'poll'), default='auto',
+                        help='acquisition path, auto uses capture on supported models')
+    parser.add_argument('--duration', type=float, help='logging duration in s, unlimited if omitted')
+    parser.add_argument('--capacity', type=int, help='number of rows to pre-allocate (.npy only)')
+    parser.add_argument('--stats-interval', type=float, default=10., help='statistics report interval in s')
+    args = parser.parse_args(argv)
+
+    from . import SampleWriter, SR860
+
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+    if args.duration is not None:
+        timer = threading.Timer(args.duration, stop.set)
+        timer.daemon = True
+        timer.start()
+
+    lia = SR860(args.resource)
+    try:
+        if args.config:
+            apply_config(lia, args.config)
+        mode = args.mode
+        if mode == 'auto':
+            mode = 'capture' if lia.model is not None else 'poll'
+        attrs = dict(lia.settings_snapshot(), mode=mode, columns=','.join(COLUMNS))
+        stats = _Stats(args.stats_interval)
+        log = log_capture if mode == 'capture' else log_poll
+        with SampleWriter(args.output, len(COLUMNS), capacity=args.capacity, attrs=attrs) as writer:
+            log(lia, writer, args.rate, stop, stats)
+        stats.update(0, force=True)
+    finally:
+        lia.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,137 @@
+import threading
+import time
+
+
+class CoalescingWriter:
+    """Last-write-wins writes of rapidly changing setpoints.
+
+    While running, writes to the lock-in (including those of property
+    setters such as lia.frequency = ...) only store the latest value per
+    API attribute. A background thread sends all pending attributes in
+    one batched message, at most max_rate times per second, so the
+    instrument converges to the newest setpoint within about one period
+    however fast values are set. Actions such as auto functions are not
+    coalesced: pending values are sent first and the action is written
+    immediately. Reads are not affected and may return the previous value
+    of a pending attribute.
+
+    Example:
+        with lia.coalesce(max_rate=20) as writer:
+            for f in slider_values:
+                lia.frequency = f
+        print(writer.coalesced, 'writes skipped')
+    """
+
+    def __init__(self, lia, max_rate=50.):
+        """
+        Args:
+            lia (SR860): lock-in amplifier
+            max_rate (float): maximum number of messages per second
+        """
+        if not max_rate > 0:
+            raise ValueError('Expected max_rate > 0 Hz.')
+        self._lia = lia
+        self._period = 1. / max_rate
+        self._pending = {}
+        self._condition = threading.Condition()
+        # keeps messages in order between the thread and flush()
+        self._send_lock = threading.Lock()
+        self._running = False
+        self._thread = None
+        self.error = None
+        self.messages = 0
+        self.coalesced = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start coalescing the writes to the lock-in."""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError('Coalescing writer is already running.')
+        self.error = None
+        self._running = True
+        # the instance attribute shadows VisaDevice.write
+        self._lia.write = self.write
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Send the pending writes and stop coalescing.
+
+        Raises:
+            RuntimeError: If sending failed.
+        """
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+        vars(self._lia).pop('write', None)
+        # writes stored after the thread exited and before the override
+        # was removed
+        if self.error is None:
+            try:
+                self.flush()
+            except Exception as e:
+                self.error = e
+        if self.error is not None:
+            raise RuntimeError('Coalesced write failed.') from self.error
+
+    def write(self, attribute, *args):
+        """Store the value of an attribute to be sent, replacing a pending one.
+
+        Args:
+            attribute (str): name of the attribute in the API dictionary
+            *args: arguments formatted into the request string
+
+        Raises:
+            RuntimeError: If sending failed.
+        """
+        if self.error is not None:
+            raise RuntimeError('Coalesced write failed.') from self.error
+        lia = self._lia
+        if lia.API[attribute][0] == () or attribute in lia._invalidates:
+            self.flush()
+            type(lia).write(lia, attribute, *args)
+            return
+        # raises for wrong arguments now rather than on the thread
+        lia._format_write(attribute, *args)
+        with self._condition:
+            if self._pending.pop(attribute, None) is not None:
+                self.coalesced += 1
+            self._pending[attribute] = args
+            self._condition.notify()
+
+    def flush(self):
+        """Send the pending writes now."""
+        with self._send_lock:
+            with self._condition:
+                commands = [(attribute,) + args for attribute, args in self._pending.items()]
+                self._pending.clear()
+            if commands:
+                self._lia.batch_write(*commands)
+                self.messages += 1
+
+    def _run(self):
+        sent = -float('inf')
+        while True:
+            with self._condition:
+                while self._running and not self._pending:
+                    self._condition.wait()
+                if not self._pending:
+                    return
+            # further writes are coalesced while waiting
+            delay = sent + self._period - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                self.flush()
+            except Exception as e:
+                self.error = e
+                return
+            sent = time.perf_counter()
@@ -0,0 +1,159 @@
+import numpy as np
+
+
+class MinMaxDecimator:
+    """Incremental min / max envelope of a growing record for live plots.
+
+    Samples are folded into at most 2 * width buckets of equal size. When
+    all buckets are full, adjacent pairs are merged and the bucket size is
+    doubled, so memory is fixed and a plot refresh costs O(width) however
+    many samples have been appended. Whole buckets of a block are reduced
+    in one vectorized pass; only a partial bucket at either end of a block
+    is accumulated sample by sample.
+
+    Example:
+        envelope = MinMaxDecimator(width=1000, channels=2)
+        for block in lia.capture_stream(config='XY'):
+            envelope.append(block)
+            line.set_data(*envelope.polyline(channel=0))
+    """
+
+    def __init__(self, width, channels=1):
+        """
+        Args:
+            width (int): display width in pixels, the envelope holds
+                between width and 2 * width buckets
+            channels (int): number of channels
+        """
+        if width < 1:
+            raise ValueError('Expected width >= 1.')
+        self._width = width
+        self._t = np.zeros(2 * width)
+        self._min = np.zeros((2 * width, channels))
+        self._max = np.zeros((2 * width, channels))
+        self._n = 0
+        self._tail_t = 0.
+        self._tail_min = np.full(channels, np.inf)
+        self._tail_max = np.full(channels, -np.inf)
+        self._tail_count = 0
+        self.size = 1
+        self.count = 0
+
+    def append(self, block, t=None):
+        """Add a sample or block of samples.
+
+        Args:
+            block (array_like): sample (channels,) or block (n, channels)
+            t (array_like): time stamps of the samples, defaults to the
+                sample index
+        """
+        block = np.asarray(block, dtype=float)
+        block = block.reshape(-1, self._min.shape[1])
+        if t is None:
+            t = np.arange(self.count, self.count + len(block), dtype=float)
+        else:
+            t = np.atleast_1d(np.asarray(t, dtype=float))
+        self.count += len(block)
+
+        i = 0
+        while i < len(block):
+            size = self.size
+            if self._tail_count or len(block) - i < size:
+                # fill the partial bucket
+                k = min(size - self._tail_count, len(block) - i)
+                if not self._tail_count:
+                    self._tail_t = t[i]
+                np.minimum(self._tail_min, block[i:i + k].min(axis=0), out=self._tail_min)
+                np.maximum(self._tail_max, block[i:i + k].max(axis=0), out=self._tail_max)
+                self._tail_count += k
+                i += k
+                if self._tail_count == size:
+                    self._push(self._tail_t[np.newaxis], self._tail_min, self._tail_max)
+                    self._tail_min.fill(np.inf)
+                    self._tail_max.fill(-np.inf)
+                    self._tail_count = 0
+            else:
+                # whole buckets in one pass
+                m = min((len(block) - i) // size, len(self._t) - self._n)
+                chunk = block[i:i + m * size].reshape(m, size, -1)
+                self._push(t[i:i + m * size:size], chunk.min(axis=1), chunk.max(axis=1))
+                i += m * size
+
+    def _push(self, t, lo, hi):
+        n = self._n + len(t)
+        self._t[self._n:n] = t
+        self._min[self._n:n] = lo
+        self._max[self._n:n] = hi
+        self._n = n
+        if n == len(self._t):
+            # merge adjacent pairs, the tail is empty here
+            self._t[:self._width] = self._t[0::2]
+            self._min[:self._width] = np.minimum(self._min[0::2], self._min[1::2])
+            self._max[:self._width] = np.maximum(self._max[0::2], self._max[1::2])
+            self._n = self._width
+            self.size *= 2
+
+    def buckets(self):
+        """Get the envelope, including a partial last bucket.
+
+        Returns:
+            tuple: bucket start times (n,) and min, max (n, channels) arrays
+        """
+        n = self._n
+        if not self._tail_count:
+            return self._t[:n].copy(), self._min[:n].copy(), self._max[:n].copy()
+        return (np.append(self._t[:n], self._tail_t),
+                np.vstack((self._min[:n], self._tail_min)),
+                np.vstack((self._max[:n], self._tail_max)))
+
+    def polyline(self, channel=0):
+        """Get the envelope of a channel as one line alternating between
+        bucket min and max, which draws the full range of every pixel.
+
+        Args:
+            channel (int): channel index
+
+        Returns:
+            tuple: x (2 * n,) and y (2 * n,) arrays
+        """
+        t, lo, hi = self.buckets()
+        return np.repeat(t, 2), np.column_stack((lo[:, channel], hi[:, channel])).ravel()
+
+
+def lttb(x, y, n):
+    """Downsample a line to n points by Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last point and, from each of n - 2 buckets, the
+    point forming the largest triangle with the previously kept point and
+    the mean of the next bucket. Preserves the visual shape of a line
+    better than min / max for a single trace.
+
+    Args:
+        x (array_like): (N,) increasing x values
+        y (array_like): (N,) y values
+        n (int): number of points, at least 3
+
+    Returns:
+        tuple: x (n,) and y (n,) arrays, or copies of the input if N <= n
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    if n < 3:
+        raise ValueError('Expected n >= 3.')
+    if len(x) <= n:
+        return x.copy(), y.copy()
+
+    edges = np.linspace(1, len(x) - 1, n - 1).astype(int)
+    index = np.empty(n, dtype=int)
+    index[0], index[-1] = 0, len(x) - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], edges[i + 1]
+        if i < n - 3:
+            cx, cy = x[hi:edges[i + 2]].mean(), y[hi:edges[i + 2]].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        index[i + 1] = a
+    return x[index], y[index]
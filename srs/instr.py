@@ -1,11 +1,85 @@
-import pyvisa
+import sys
+import threading
+import time
+
+from .trace import TraceRecorder
+
+
+def _visa_errors():
+    """I/O errors of the loaded VISA backend, if any."""
+    pyvisa = sys.modules.get('pyvisa')
+    return () if pyvisa is None else (pyvisa.errors.VisaIOError,)
+
+
+class CommandError(RuntimeError):
+    """The instrument rejected a written command.
+
+    Attributes:
+        status (int): standard event status register
+        commands (list): (attribute, args) tuples of the commands that may
+            have failed, a single one if it could be located
+    """
+
+    def __init__(self, message, status, commands):
+        super().__init__(message)
+        self.status = status
+        self.commands = commands
 
 
 class VisaDevice:
 
-    def __init__(self, devpath):
+    # request prefixes of commands that keep the device busy for long
+    _slow_requests = ()
+    # instrument functions (actions) and the attributes of the stored
+    # configuration they invalidate, None for all. Attributes without
+    # arguments are actions invalidating all unless listed.
+    _invalidates = {}
+    # read-only attributes that never change, e.g. the identification
+    _constant_reads = ()
+    # standard event status register query and its error bits (IEEE 488.2)
+    _status_request = '*ESR?'
+    _status_errors = ((2, 'query error'), (3, 'device dependent error'), (4, 'execution error'),
+                      (5, 'command error'))
+
+    def __init__(self, devpath, retries=2, timeout=2., slow_timeout=30., timeout_factor=10., trace=None,
+                 error_check=None, min_timeout=0.1):
+        """
+        Args:
+            devpath (str): VISA resource name, or a transport object such
+                as srs.trace.ReplayTransport
+            retries (int): number of retries of failed queries
+            timeout (float): maximum query timeout in second
+            slow_timeout (float): timeout in second for the query following
+                a slow command (e.g. reset or auto functions)
+            timeout_factor (float): query timeout in multiples of the
+                observed query latency, at most timeout
+            trace (str): file to record all bus transactions to, see
+                srs.trace.TraceRecorder
+            error_check (int): check the status register once every
+                error_check written commands, piggybacked on the message of
+                the last one, None to disable. See check_errors().
+            min_timeout (float): minimum query timeout in second, so that
+                scheduling delays of the host do not time out queries
+        """
         self._devpath = devpath
         self._dev = None
+        # serializes bus access from acquisition threads
+        self._lock = threading.RLock()
+        self._retries = retries
+        self._timeout = timeout
+        self._slow_timeout = slow_timeout
+        self._timeout_factor = timeout_factor
+        self._min_timeout = min_timeout
+        self._latency = None
+        self._slow_pending = False
+        self._dev_timeout = None
+        # last written configuration, re-applied by reconnect()
+        self._state = {}
+        self._trace_path = trace
+        self._trace = None if trace is None else open(trace, 'w')
+        self._error_check = error_check
+        # (attribute, args) of the commands written since the last check
+        self._unchecked = []
         self.open()
 
     def __del__(self):
@@ -14,9 +88,29 @@ class VisaDevice:
     def open(self):
         if self._dev is not None:
             raise RuntimeError('Device has already been opened.')
-        self._dev = pyvisa.ResourceManager().open_resource(self._devpath)
+        if isinstance(self._devpath, str):
+            # imported on first use, transport objects do not need pyvisa
+            import pyvisa
+            self._dev = pyvisa.ResourceManager().open_resource(self._devpath)
+        else:
+            self._dev = self._devpath
+        if self._trace_path is not None:
+            if self._trace is None:
+                # reopened after close(), continue the trace
+                self._trace = open(self._trace_path, 'a')
+            self._dev = TraceRecorder(self._dev, self._trace)
+        self._dev_timeout = None
 
     def close(self):
+        try:
+            self._close_device()
+        finally:
+            if self._trace is not None:
+                self._trace.close()
+                self._trace = None
+
+    def _close_device(self):
+        """Closes the device, keeping the trace file open."""
         if self._dev is not None:
             self._dev.close()
             self._dev = None
@@ -25,6 +119,18 @@ class VisaDevice:
         if self._dev is not None:
             self._dev.clear()
 
+    def reconnect(self):
+        """Reopen the device and re-apply the last known configuration
+        in a single batched write."""
+        with self._lock:
+            try:
+                self._close_device()
+            except _visa_errors():
+                self._dev = None
+            self.open()
+            if self._state:
+                self._write(';'.join(self._format_write(attribute, *args) for attribute, args in self._state.items()))
+
     def write(self, attribute, *args):
         """Writes a value for a given attribute from the SerialDevice.
 
@@ -36,6 +142,25 @@ class VisaDevice:
             ValueError: If the number of arguments does not match the
                 expected number based on the attribute's data types, or if
                 an invalid return value is received for a boolean type.
+            CommandError: If error checking is enabled and the instrument
+                rejected a command.
+        """
+        # formats request string with arg, if any, and passes it to the write method
+        self._send(self._format_write(attribute, *args), [(attribute, args)])
+
+    def _format_write(self, attribute, *args):
+        """Formats the write request string for a given attribute.
+
+        Args:
+            attribute (str): The name of the attribute to read from self.API dictionary. 
+            *args: Arguments to be formatted into the request string.
+
+        Returns:
+            str: request string
+
+        Raises:
+            ValueError: If the number of arguments does not match the
+                expected number based on the attribute's data types.
         """
         dtype, request, _ = self.API[attribute] # unpacks tuple of three, _ is ignored
         
@@ -49,8 +174,113 @@ class VisaDevice:
         # zip and for loop because dtype and args are tuples
         arg = ((int(ar) if dt is bool else dt(ar)) for dt, ar in zip(dtype, args))
         
-        # formats request string with arg, if any, and passes it to the write method
-        self._write(request.format(*arg))
+        return request.format(*arg)
+
+    def batch_write(self, *commands):
+        """Writes values for several attributes in a single message.
+
+        Args:
+            *commands: (attribute, *args) tuples, see write().
+
+        Raises:
+            CommandError: If error checking is enabled and the instrument
+                rejected a command.
+        """
+        self._send(';'.join(self._format_write(*command) for command in commands),
+                   [(command[0], command[1:]) for command in commands])
+
+    def _send(self, message, commands):
+        """Writes a message of commands. With error checking enabled, the
+        status query is appended to the message once error_check commands
+        have been written since the last check. The configuration is
+        updated under the lock, so reconnect() never sees a partial one."""
+        with self._lock:
+            if self._error_check is None:
+                self._write(message)
+                self._remember(commands)
+                return
+            self._unchecked.extend(commands)
+            if len(self._unchecked) < self._error_check:
+                self._write(message)
+                self._remember(commands)
+                return
+            status = int(self._query_once(message + ';' + self._status_request))
+            self._remember(commands)
+            self._raise_for_status(status)
+
+    def _query_with_writes(self, request, *commands):
+        """Sends a query followed by commands in one message and reads the
+        response, e.g. to read a point and set up the next one.
+
+        Args:
+            request (str): query request string
+            *commands: (attribute, *args) tuples, see write().
+
+        Returns:
+            str: data
+        """
+        with self._lock:
+            rdata = self._query(';'.join([request] + [self._format_write(*command) for command in commands]))
+            self._remember([(command[0], command[1:]) for command in commands])
+            return rdata
+
+    def check_errors(self):
+        """Checks whether the instrument rejected any command since the
+        last check, e.g. at the end of a sequence of writes.
+
+        Raises:
+            CommandError: If the instrument rejected a command.
+        """
+        with self._lock:
+            self._raise_for_status(int(self._query(self._status_request)))
+
+    def _raise_for_status(self, status):
+        """Raises CommandError for the commands since the last check if the
+        status register reports an error."""
+        commands, self._unchecked = self._unchecked, []
+        errors = [name for bit, name in self._status_errors if status >> bit & 1]
+        if not errors:
+            return
+        commands = self._locate_error(commands)
+        requests = [self._format_write(attribute, *args) for attribute, args in commands]
+        if len(requests) == 1:
+            message = 'Command \'{}\' failed: {}.'.format(requests[0], ', '.join(errors))
+        elif requests:
+            message = 'One of the commands {} failed: {}.'.format(requests, ', '.join(errors))
+        else:
+            message = 'Instrument reported: {}.'.format(', '.join(errors))
+        raise CommandError(message, status, commands)
+
+    def _locate_error(self, commands):
+        """Narrows down the failed command by reading back the written
+        values. Commands that cannot be read back, or were overwritten by a
+        later command, remain suspects."""
+        if len(commands) <= 1:
+            return commands
+        last = {attribute: i for i, (attribute, _) in enumerate(commands)}
+        suspects = []
+        for i, (attribute, args) in enumerate(commands):
+            dtype, _, request = self.API[attribute]
+            if request is None or isinstance(dtype, tuple) or last[attribute] != i:
+                suspects.append((attribute, args))
+            elif self._format_write(attribute, self.read(attribute)) != self._format_write(attribute, *args):
+                return [(attribute, args)]
+        return suspects
+
+    def _remember(self, commands):
+        """Keeps track of the written configuration for reconnect(). Called
+        with the lock held."""
+        for attribute, args in commands:
+            if self.API[attribute][0] != () and attribute not in self._invalidates:
+                # most recently written last
+                self._state.pop(attribute, None)
+                self._state[attribute] = args
+                continue
+            invalidated = self._invalidates.get(attribute)
+            if invalidated is None:
+                self._state.clear()
+            for name in invalidated or ():
+                self._state.pop(name, None)
 
     def read(self, attribute, *args):
         """Reads a value for a given attribute from the SerialDevice.
@@ -92,7 +322,15 @@ class VisaDevice:
         Args:
             data (str): write data
         """
-        self._dev.write(data)#.encode('utf-8'))
+        with self._lock:
+            self._dev.write(data)#.encode('utf-8'))
+            if self._is_slow(data):
+                self._slow_pending = True
+
+    def _is_slow(self, data):
+        """Whether a message contains a slow command."""
+        return bool(self._slow_requests) and any(
+            part.lstrip().startswith(self._slow_requests) for part in data.split(';'))
 
     def _read(self):
         """Read from device.
@@ -115,6 +353,87 @@ class VisaDevice:
         Returns:
             str: data
         """
+        with self._lock:
+            return self._retry(self._query_once, data)
+
+    def _query_raw(self, data):
+        """Write to device and read the undecoded response.
+
+        Args:
+            data (str): write data
+
+        Returns:
+            bytes: data including the termination
+        """
+        with self._lock:
+            return self._retry(self._query_once, data, True)
+
+    def _query_once(self, data, raw=False):
+        # the response to a message with a slow command (e.g. a piggybacked
+        # status query) is only sent once the command has completed
+        self._set_timeout(self._slow_timeout if self._is_slow(data) else None)
+        t = time.perf_counter()
         self._write(data)
-        return self._read()
+        rdata = self._dev.read_raw() if raw else self._read()
+        self._observe(time.perf_counter() - t)
+        return rdata
+
+    def _query_binary(self, data, datatype='f', container=list):
+        """Write to device and read an IEEE 488.2 binary block response.
+
+        Args:
+            data (str): write data
+            datatype (str): struct format character of the block values
+            container (callable): container type of the returned values
+
+        Returns:
+            container: little-endian values of the binary block
+        """
+        with self._lock:
+            return self._retry(self._query_binary_once, data, datatype, container)
+
+    def _query_binary_once(self, data, datatype, container):
+        # transfer time depends on the block size, use the maximum timeout
+        self._set_timeout(self._timeout)
+        return self._dev.query_binary_values(data, datatype=datatype, is_big_endian=False, container=container)
+
+    def _set_timeout(self, timeout=None):
+        """Sets the timeout of the next transaction, derived from the
+        observed latency unless given."""
+        if timeout is None:
+            if self._slow_pending:
+                timeout = self._slow_timeout
+            elif self._latency is None:
+                timeout = self._timeout
+            else:
+                timeout = min(max(self._timeout_factor * self._latency, self._min_timeout), self._timeout)
+        timeout = max(int(timeout * 1000), 1)
+        if timeout != self._dev_timeout:
+            self._dev.timeout = timeout  # ms
+            self._dev_timeout = timeout
+
+    def _observe(self, latency):
+        """Updates the observed query latency."""
+        if self._slow_pending:
+            self._slow_pending = False
+        elif self._latency is None:
+            self._latency = latency
+        else:
+            self._latency += 0.2 * (latency - self._latency)
+
+    def _retry(self, query, *args):
+        """Runs an idempotent query, clearing the device between attempts
+        and reconnecting if clearing fails."""
+        for attempt in range(self._retries + 1):
+            try:
+                return query(*args)
+            except _visa_errors():
+                if attempt == self._retries:
+                    raise
+            # give a slow instrument the benefit of the doubt next time
+            self._slow_pending = True
+            try:
+                self.clear()
+            except _visa_errors():
+                self.reconnect()
 
@@ -0,0 +1,157 @@
+import threading
+import time
+
+import numpy as np
+
+from .buffers import ByteArena, RingBuffer
+
+
+class Poller:
+    """Poll the XYRP snapshot (SNAPD?) at a fixed rate on a dedicated thread.
+
+    Polls follow a deadline schedule on the monotonic perf_counter clock, so
+    the rate does not drift with the bus latency. Deadlines that passed while
+    a poll was in progress are skipped and counted as missed. Each sample is
+    timestamped at the midpoint between sending the query and receiving the
+    response and stored in a preallocated ring buffer with the columns:
+
+        time (s, epoch), latency (s), X, Y, R, P
+
+    In deferred mode the poll loop only copies the raw responses into a
+    preallocated ByteArena and the X, Y, R, P columns are parsed in one
+    vectorized pass by parse() after polling has stopped.
+
+    Example:
+        with lia.poller(rate=100) as poller:
+            time.sleep(10)
+        data = poller.samples.latest()
+        print(poller.stats())
+    """
+
+    columns = ('time', 'latency', 'X', 'Y', 'R', 'P')
+
+    def __init__(self, lia, rate, capacity=100000, deferred=False):
+        """
+        Args:
+            lia (SR860): lock-in amplifier to poll
+            rate (float): target poll rate in Hz
+            capacity (int): number of samples held in the ring buffer
+            deferred (bool): defer parsing of the responses to parse()
+        """
+        if not rate > 0:
+            raise ValueError('Expected rate > 0 Hz.')
+        self._lia = lia
+        self._period = 1. / rate
+        self.samples = RingBuffer(capacity, len(self.columns))
+        self._lateness = RingBuffer(capacity, 1)
+        self.raw = ByteArena(capacity) if deferred else None
+        self.missed = 0
+        self.error = None
+        self._started = None
+        self._stopped = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start polling."""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError('Poller is already running.')
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop polling.
+
+        Raises:
+            RuntimeError: If polling failed.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self.error is not None:
+            raise RuntimeError('Polling failed.') from self.error
+
+    def _run(self):
+        request = self._lia.API['XYRP'][2]
+        period = self._period
+        samples, lateness, raw = self.samples, self._lateness, self.raw
+        nan = float('nan')
+        # offset between the perf_counter clock and the epoch
+        offset = time.time() - time.perf_counter()
+        start = self._started = time.perf_counter()
+        self._stopped = None
+        k = 0
+        try:
+            while not self._stop.is_set():
+                deadline = start + k * period
+                delay = deadline - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                t_send = time.perf_counter()
+                if raw is None:
+                    response = self._lia._query(request)
+                    t_recv = time.perf_counter()
+                    X, Y, R, P = response.split(',')
+                    samples.append((offset + 0.5 * (t_send + t_recv), t_recv - t_send,
+                                    float(X), float(Y), float(R), float(P)))
+                else:
+                    raw.append(self._lia._query_raw(request))
+                    t_recv = time.perf_counter()
+                    samples.append((offset + 0.5 * (t_send + t_recv), t_recv - t_send, nan, nan, nan, nan))
+                lateness.append((t_send - deadline,))
+
+                # skip deadlines that passed during this poll
+                due = int((t_recv - start) / period)
+                self.missed += max(due - k - 1, 0)
+                k = max(k + 1, due)
+        except Exception as e:
+            self.error = e
+        finally:
+            self._stopped = time.perf_counter()
+
+    def parse(self):
+        """Parse the raw responses of deferred mode into the samples.
+
+        Returns:
+            numpy.ndarray: (n, 6) samples held in the ring buffer, oldest first
+
+        Raises:
+            RuntimeError: If polling is still running.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError('Stop polling before parsing.')
+        data = self.samples.latest()
+        if self.raw is not None:
+            data[:, 2:] = self.raw.parse(4)
+        return data
+
+    def stats(self):
+        """Get timing statistics of the samples held in the ring buffer.
+
+        Returns:
+            dict: samples, achieved rate in Hz, missed deadlines, and median,
+                90th and 99th percentile and maximum jitter (lateness of the
+                poll with respect to its deadline) in s
+        """
+        if self._started is None or not len(self.samples):
+            return {'samples': 0, 'rate': 0., 'missed': self.missed}
+        stop = time.perf_counter() if self._stopped is None else self._stopped
+        jitter = self._lateness.latest()[:, 0]
+        p50, p90, p99 = np.percentile(jitter, (50, 90, 99))
+        return {
+            'samples': self.samples.count,
+            'rate': self.samples.count / (stop - self._started),
+            'missed': self.missed,
+            'jitter p50': float(p50),
+            'jitter p90': float(p90),
+            'jitter p99': float(p99),
+            'jitter max': float(jitter.max()),
+            }
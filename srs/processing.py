@@ -0,0 +1,95 @@
+import numpy as np
+
+# channel order of calibrated blocks
+COLUMNS = ('X', 'Y', 'R', 'theta')
+
+
+def full_scale(settings):
+    """Get the full scale of the outputs in SI units.
+
+    Args:
+        settings (dict): SR860.settings_snapshot()
+
+    Returns:
+        float: full scale in V (voltage input) or A (current input)
+    """
+    scale = 1e-6 if settings.get('input_mode') == 'current' else 1.
+    return settings['sensitivity'] * scale
+
+
+def undo_offset_expand(values, settings, channel, scale=1., out=None):
+    """Undo the output offset and expand of a channel, assuming
+    output = (signal - offset * full scale) * expand.
+
+    Args:
+        values (numpy.ndarray): raw channel values
+        settings (dict): SR860.settings_snapshot()
+        channel (str): 'X', 'Y' or 'R'
+        scale (float): factor applied to the raw values first, e.g. the
+            full scale for values in fractions of full scale
+        out (numpy.ndarray): output array, may be values itself
+
+    Returns:
+        numpy.ndarray: signal values
+    """
+    out = np.multiply(values, scale / settings.get(channel + '_expand', 1), out=out)
+    if settings.get(channel + '_offset_enable', False):
+        out += settings[channel + '_offset'] / 100. * full_scale(settings)
+    return out
+
+
+def calibrate(block, settings, config='XY', normalized=False, out=None):
+    """Calibrate raw output channels in one vectorized pass.
+
+    Undoes the X, Y and R offsets and expands, converts current-input data
+    from the uA scale of the sensitivity to A, and derives R and theta from
+    X and Y (or X and Y from R and theta).
+
+    Args:
+        block (numpy.ndarray): (n, channels) raw values in config order,
+            e.g. from SR860.capture_stream() or stacked XYRP_outputs()
+        settings (dict): SR860.settings_snapshot()
+        config (str): channels of block, in SR860.capture_configs
+        normalized (bool): raw X, Y, R are fractions of full scale
+        out (numpy.ndarray): (n, 4) float64 output array to fill
+
+    Returns:
+        numpy.ndarray: (n, 4) X, Y, R in V or A and theta in deg
+    """
+    if config not in ('X', 'XY', 'RT', 'XYRT'):
+        raise ValueError('Expected str in set: {}.'.format(('X', 'XY', 'RT', 'XYRT')))
+    block = np.asarray(block)
+    if block.ndim != 2 or block.shape[1] != len(config):
+        raise ValueError('Expected (n, {}) block.'.format(len(config)))
+    if out is None:
+        out = np.empty((len(block), 4))
+    elif out.shape != (len(block), 4):
+        raise ValueError('Expected (n, 4) output array.')
+
+    scale = full_scale(settings) if normalized else (1e-6 if settings.get('input_mode') == 'current' else 1.)
+    X, Y, R, theta = out.T
+    raw = dict(zip(config.replace('RT', 'Rt'), block.T))
+
+    if 'X' in raw:
+        undo_offset_expand(raw['X'], settings, 'X', scale, out=X)
+    if 'Y' in raw:
+        undo_offset_expand(raw['Y'], settings, 'Y', scale, out=Y)
+    if 'R' in raw:
+        undo_offset_expand(raw['R'], settings, 'R', scale, out=R)
+        theta[:] = raw['t']
+
+    if config == 'X':
+        Y.fill(np.nan)
+        R.fill(np.nan)
+        theta.fill(np.nan)
+    elif config == 'XY':
+        np.hypot(X, Y, out=R)
+        np.arctan2(Y, X, out=theta)
+        np.degrees(theta, out=theta)
+    elif config == 'RT':
+        np.radians(theta, out=X)
+        np.sin(X, out=Y)
+        np.cos(X, out=X)
+        X *= R
+        Y *= R
+    return out
@@ -0,0 +1,213 @@
+import collections
+import contextlib
+import functools
+import os
+import sys
+import threading
+import time
+
+from .instr import VisaDevice
+
+_PACKAGE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+BusRecord = collections.namedtuple('BusRecord', 'kind attribute request value duration call_site via')
+BusRecord.__doc__ = """Bus transaction recorded by profile_bus().
+
+kind is 'read', 'write', 'batch' (batch_write or a query with piggybacked
+writes, value the commands, or a raw message with value None) or 'query'
+(raw, undecoded or binary query), attribute the API attribute (None for
+batches and raw queries), via the outermost srs function that issued it
+(e.g. the property name) and call_site the first caller outside the srs
+package as 'file:line'.
+"""
+
+
+def _call_site():
+    """Get the first caller outside the srs package and the srs function it called."""
+    frame = sys._getframe(2)
+    via = None
+    while frame is not None and os.path.dirname(os.path.abspath(frame.f_code.co_filename)) == _PACKAGE_DIR:
+        via = frame.f_code.co_name
+        frame = frame.f_back
+    if frame is None:
+        return '<unknown>', via
+    return '{}:{}'.format(frame.f_code.co_filename, frame.f_lineno), via
+
+
+class BusProfile:
+    """Bus transactions recorded by profile_bus() and their analysis."""
+
+    def __init__(self):
+        self.records = []
+        # settings and constant attributes, measurements are never cacheable
+        self.cacheable = set()
+
+    def by_call_site(self, n=10):
+        """Get the call sites with the largest total bus time.
+
+        Args:
+            n (int): number of call sites
+
+        Returns:
+            list: (call site, transactions, total time in s) tuples
+        """
+        count = collections.Counter()
+        total = collections.Counter()
+        for record in self.records:
+            count[record.call_site] += 1
+            total[record.call_site] += record.duration
+        return [(site, count[site], t) for site, t in total.most_common(n)]
+
+    def redundant_reads(self):
+        """Get reads of settings and constants that returned the same value as
+        the previous read of the same attribute, without a write in between
+        that could change it. Measurements and status (e.g. X, capture
+        progress) are not included.
+
+        Returns:
+            list: BusRecord of redundant reads
+        """
+        last, redundant = {}, []
+        for record in self.records:
+            if record.kind == 'read' and record.attribute in self.cacheable:
+                if record.attribute in last and last[record.attribute] == record.value:
+                    redundant.append(record)
+                last[record.attribute] = record.value
+            elif record.kind == 'write' and record.value == ():
+                # instrument functions (e.g. *RST, auto functions) may change any setting
+                last.clear()
+            elif record.kind == 'write':
+                last.pop(record.attribute, None)
+            elif record.kind == 'batch':
+                for command in record.value or ((None,),):
+                    if command[0] is None or len(command) == 1:
+                        last.clear()
+                    else:
+                        last.pop(command[0], None)
+        return redundant
+
+    def _write_runs(self):
+        """Runs of consecutive writes without a read in between."""
+        runs, run = [], []
+        for record in self.records:
+            if record.kind in ('write', 'batch'):
+                run.append(record)
+                continue
+            if len(run) > 1:
+                runs.append(run)
+            run = []
+        if len(run) > 1:
+            runs.append(run)
+        return runs
+
+    def suggestions(self):
+        """Suggest optimizations: cacheable reads and batchable writes.
+
+        Returns:
+            list: str suggestions, most expensive first
+        """
+        cacheable = collections.defaultdict(list)
+        for record in self.redundant_reads():
+            cacheable[record.attribute].append(record)
+        suggestions = []
+        for attribute, records in cacheable.items():
+            t = sum(record.duration for record in records)
+            sites = sorted(set(record.call_site for record in records))
+            suggestions.append((t, '{:.3f} s: \'{}\' read {} times without change (at {}); cache the value.'.format(
+                t, attribute, len(records), ', '.join(sites))))
+
+        for run in self._write_runs():
+            t = sum(record.duration for record in run[1:])
+            suggestions.append((t, '{:.3f} s: {} consecutive writes at {}; send them as one message \'{}\'.'.format(
+                t, len(run), run[0].call_site, ';'.join(record.request for record in run))))
+
+        return [text for _, text in sorted(suggestions, key=lambda s: -s[0])]
+
+    def report(self, n=10):
+        """Get a text report of the recorded bus usage.
+
+        Args:
+            n (int): number of call sites listed
+
+        Returns:
+            str: report
+        """
+        total = sum(record.duration for record in self.records)
+        lines = ['{} transactions, {:.3f} s bus time'.format(len(self.records), total), '', 'Top call sites:']
+        for site, count, t in self.by_call_site(n):
+            lines.append('  {:8.3f} s  {:6d}x  {}'.format(t, count, site))
+        suggestions = self.suggestions()
+        if suggestions:
+            lines += ['', 'Suggestions:'] + ['  ' + s for s in suggestions]
+        return '\n'.join(lines)
+
+
+@contextlib.contextmanager
+def profile_bus():
+    """Record all bus transactions of VisaDevice: reads, writes, batched
+    and raw messages, and raw, undecoded and binary queries.
+
+    Example:
+        with srs.profile_bus() as p:
+            run_measurement(lia)
+        print(p.report())
+
+    Yields:
+        BusProfile: recorded transactions
+    """
+    profile = BusProfile()
+    local = threading.local()
+    kinds = {
+        'read': 'read',
+        'write': 'write',
+        'batch_write': 'batch',
+        '_write': 'batch',
+        '_query': 'query',
+        '_query_raw': 'query',
+        '_query_binary': 'query',
+        '_query_with_writes': 'batch',
+        }
+    originals = {name: getattr(VisaDevice, name) for name in kinds}
+
+    def wrap(kind, method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            # only record the outermost call, read() itself calls _query()
+            if getattr(local, 'active', False):
+                return method(self, *args, **kwargs)
+            local.active = True
+            try:
+                t = time.perf_counter()
+                value = method(self, *args, **kwargs)
+                duration = time.perf_counter() - t
+            finally:
+                local.active = False
+            call_site, via = _call_site()
+            if kind == 'query':
+                record = BusRecord(kind, None, args[0], value, duration, call_site, via)
+            elif kind == 'batch' and method is originals['_write']:
+                # raw message, e.g. the configuration re-applied by reconnect()
+                record = BusRecord(kind, None, args[0], None, duration, call_site, via)
+            elif kind == 'batch' and method is originals['_query_with_writes']:
+                request = ';'.join([args[0]] + [self._format_write(*command) for command in args[1:]])
+                record = BusRecord(kind, None, request, args[1:], duration, call_site, via)
+            elif kind == 'batch':
+                request = ';'.join(self._format_write(*command) for command in args)
+                record = BusRecord(kind, None, request, args, duration, call_site, via)
+            elif kind == 'read':
+                if self.API[args[0]][1] is not None or args[0] in self._constant_reads:
+                    profile.cacheable.add(args[0])
+                record = BusRecord(kind, args[0], self.API[args[0]][2], value, duration, call_site, via)
+            else:
+                record = BusRecord(kind, args[0], self._format_write(*args), args[1:], duration, call_site, via)
+            profile.records.append(record)
+            return value
+        return wrapper
+
+    for name, kind in kinds.items():
+        setattr(VisaDevice, name, wrap(kind, originals[name]))
+    try:
+        yield profile
+    finally:
+        for name, method in originals.items():
+            setattr(VisaDevice, name, method)
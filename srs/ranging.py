@@ -0,0 +1,103 @@
+import time
+
+
+class AutoRanger:
+    """Client-side sensitivity auto-ranging with hysteresis.
+
+    Decisions are made from R values the caller has already acquired
+    (e.g. from SR860.XYRP_outputs()), so ranging issues no queries of its
+    own. The current range is tracked locally as an index into
+    SR860.sensitivity_range and a change costs a single SCAL write.
+
+    A range is kept as long as lower <= R / full_scale <= upper. When R
+    leaves that window, the most sensitive range with R <= upper * full_scale
+    is selected. Moving to a less sensitive range (overload) happens
+    immediately, moving to a more sensitive range only after the dwell time
+    has passed since the last change. Samples acquired while the output
+    settles after a change are reported as invalid.
+    """
+
+    def __init__(self, lia, upper=0.9, lower=0.3, dwell=None, settle=5):
+        """
+        Args:
+            lia (SR860): lock-in amplifier to range.
+            upper (float): upper fraction of full scale.
+            lower (float): lower fraction of full scale.
+            dwell (float): minimum time in s between range changes towards
+                a more sensitive range. Defaults to the settling time.
+            settle (float): settling time after a range change in
+                number of time constants.
+
+        Raises:
+            ValueError: If the thresholds do not leave room for hysteresis.
+        """
+        ranges = lia.sensitivity_range
+        # the window has to span the largest step between adjacent ranges
+        step = max(a / b for a, b in zip(ranges, ranges[1:]))
+        if not 0. < lower * step < upper <= 1.:
+            raise ValueError('Expected 0 < lower * {} < upper <= 1.'.format(step))
+
+        self._lia = lia
+        self._ranges = ranges
+        self._index = lia.read('sensitivity')
+        self._settle = settle * lia.time_constant
+        self.upper = upper
+        self.lower = lower
+        self.dwell = self._settle if dwell is None else dwell
+        self._changed_at = time.monotonic() - max(self.dwell, self._settle)
+
+    @property
+    def sensitivity(self):
+        """Get the current sensitivity without querying the instrument.
+
+        Returns:
+            float: sensitivity in V or uA
+        """
+        return self._ranges[self._index]
+
+    @property
+    def settling(self):
+        """Whether the output is still settling after a range change.
+
+        Returns:
+            bool: settling
+        """
+        return time.monotonic() - self._changed_at < self._settle
+
+    def _target(self, R):
+        """Index of the most sensitive range with R <= upper * full scale."""
+        for index in range(len(self._ranges) - 1, -1, -1):
+            if R <= self.upper * self._ranges[index]:
+                return index
+        return 0
+
+    def update(self, R):
+        """Update the range from an acquired R value.
+
+        Args:
+            R (float): R output in V or uA
+
+        Returns:
+            bool: True if the sample is valid, False if it was acquired
+                while settling after a previous range change.
+        """
+        now = time.monotonic()
+        since_change = now - self._changed_at
+        if since_change < self._settle:
+            return False
+
+        full_scale = self._ranges[self._index]
+        if self.lower * full_scale <= abs(R) <= self.upper * full_scale:
+            return True
+
+        index = self._target(abs(R))
+        if index > self._index and since_change < self.dwell:
+            # more sensitive range, but dwell time not yet passed
+            return True
+        if index == self._index:
+            return True
+
+        self._lia.write('sensitivity', index)
+        self._index = index
+        self._changed_at = now
+        return True
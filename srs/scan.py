@@ -0,0 +1,99 @@
+import concurrent.futures
+import os
+import time
+
+import numpy as np
+
+
+def scan_points(nx, ny, serpentine=True):
+    """Get the order in which a grid is scanned, row by row.
+
+    Args:
+        nx (int): number of x positions
+        ny (int): number of y positions
+        serpentine (bool): scan every other row backwards, so the stage
+            never flies back to the start of a row
+
+    Returns:
+        list: (iy, ix) index tuples
+    """
+    points = []
+    for iy in range(ny):
+        xs = range(nx - 1, -1, -1) if serpentine and iy % 2 else range(nx)
+        points.extend((iy, ix) for ix in xs)
+    return points
+
+
+def map_scan(lia, x, y, move, path=None, serpentine=True, dwell=None, progress=None, flush_interval=1.):
+    """Measure XYRP on a 2D grid of stage positions.
+
+    The move to the next point is started on a worker thread as soon as
+    the snapshot of the current point has been read, so storing, progress
+    reporting and flushing overlap with the stage motion. The lock-in only
+    settles after a move has finished, as the signal changes while moving.
+
+    With a path, results are written into a preallocated NaN-filled
+    (ny, nx, 4) memory-mapped .npy file. Running the scan again with the
+    same path resumes it, skipping the points that are already measured.
+
+    Example:
+        data = map_scan(lia, np.linspace(0, 1e-3, 200), np.linspace(0, 1e-3, 200),
+                        stage.move_to, path='map.npy',
+                        progress=lambda done, total: print(done, total))
+
+    Args:
+        lia (SR860): lock-in amplifier
+        x (array_like): (nx,) x positions
+        y (array_like): (ny,) y positions
+        move (callable): move(x, y) moves the stage and returns when
+            the stage has arrived
+        path (str): .npy file of the results, kept in memory if None
+        serpentine (bool): scan every other row backwards
+        dwell (float): settling time per point in s, defaults to
+            SR860.settle_time() for the current time constant and slope
+        progress (callable): progress(done, total) called after each point
+        flush_interval (float): maximum time in s between flushes of the
+            results to disk
+
+    Returns:
+        numpy.ndarray: (ny, nx, 4) XYRP outputs, NaN for unmeasured points
+    """
+    x, y = np.asarray(x, dtype=float), np.asarray(y, dtype=float)
+    shape = (len(y), len(x), 4)
+    if path is None:
+        data = np.full(shape, np.nan)
+    elif os.path.exists(path):
+        data = np.load(path, mmap_mode='r+')
+        if data.shape != shape:
+            raise ValueError('Existing file {} does not match the scan grid.'.format(path))
+    else:
+        data = np.lib.format.open_memmap(path, mode='w+', dtype='float64', shape=shape)
+        data[...] = np.nan
+
+    todo = [(iy, ix) for iy, ix in scan_points(len(x), len(y), serpentine) if np.isnan(data[iy, ix, 0])]
+    total = data.shape[0] * data.shape[1]
+    done = total - len(todo)
+    dwell = lia.settle_time() if dwell is None else dwell
+    flushed = time.monotonic()
+
+    with concurrent.futures.ThreadPoolExecutor(1) as mover:
+        moving = mover.submit(move, float(x[todo[0][1]]), float(y[todo[0][0]])) if todo else None
+        for k, (iy, ix) in enumerate(todo):
+            moving.result()
+            time.sleep(dwell)
+            values = tuple(lia.XYRP_outputs())
+            if k + 1 < len(todo):
+                iy_next, ix_next = todo[k + 1]
+                moving = mover.submit(move, float(x[ix_next]), float(y[iy_next]))
+
+            data[iy, ix] = values
+            done += 1
+            if path is not None and time.monotonic() - flushed >= flush_interval:
+                data.flush()
+                flushed = time.monotonic()
+            if progress is not None:
+                progress(done, total)
+
+    if path is not None:
+        data.flush()
+    return data
@@ -0,0 +1,172 @@
+import concurrent.futures
+
+import numpy as np
+
+
+class WelchPSD:
+    """Noise power spectral density by Welch's averaged periodogram.
+
+    Blocks (e.g. from SR860.capture_stream()) are consumed segment by
+    segment: only the samples of an incomplete segment are kept between
+    updates, so the full record is never held in memory. Each segment has
+    its mean removed and is windowed before its periodogram is added.
+
+    Example:
+        psd = WelchPSD.for_capture(lia, nperseg=4096)
+        for block in lia.capture_stream(config='XY'):
+            psd.update(block)
+            if psd.segments >= 100:
+                break
+        f, asd = psd.frequencies, psd.asd   # V/sqrt(Hz) per channel
+    """
+
+    def __init__(self, fs, nperseg=1024, overlap=0.5, window='hann', enbw=None, workers=1):
+        """
+        Args:
+            fs (float): sample rate in Hz, e.g. SR860.capture_rate
+            nperseg (int): segment length in samples
+            overlap (float): segment overlap fraction in [0, 1)
+            window (str / numpy.ndarray): 'hann', 'boxcar' or window array
+            enbw (float): equivalent noise bandwidth of the lock-in output
+                filter in Hz, e.g. SR860.ENBW. Limits noise_floor() to the
+                filter pass band.
+            workers (int): number of threads computing segment FFTs
+        """
+        if not 0. <= overlap < 1.:
+            raise ValueError('Expected overlap in range [0, 1).')
+        if isinstance(window, str):
+            windows = {'hann': np.hanning, 'boxcar': np.ones}
+            if window not in windows:
+                raise ValueError('Expected str in set: {}.'.format(tuple(windows)))
+            window = windows[window](nperseg)
+        window = np.asarray(window, dtype=float)
+        if window.shape != (nperseg,):
+            raise ValueError('Expected window of nperseg samples.')
+
+        self.fs = fs
+        self.enbw = enbw
+        self.segments = 0
+        self._window = window
+        self._step = max(nperseg - int(overlap * nperseg), 1)
+        # one-sided density scaling, corrected for the window power
+        self._scale = 2. / (fs * (window ** 2).sum())
+        self._tail = None
+        self._sum = None
+        self._workers = workers
+
+    @classmethod
+    def for_capture(cls, lia, nperseg=1024, **kwargs):
+        """Get a PSD estimator for the current capture rate and ENBW.
+
+        Args:
+            lia (SR860): lock-in amplifier
+            nperseg (int): segment length in samples
+            **kwargs: further WelchPSD arguments
+
+        Returns:
+            WelchPSD: estimator
+        """
+        return cls(lia.capture_rate, nperseg, enbw=lia.ENBW, **kwargs)
+
+    @property
+    def nperseg(self):
+        """Get segment length in samples.
+
+        Returns:
+            int: segment length
+        """
+        return len(self._window)
+
+    @property
+    def frequencies(self):
+        """Get frequencies of the PSD bins in Hz.
+
+        Returns:
+            numpy.ndarray: frequencies
+        """
+        return np.fft.rfftfreq(self.nperseg, 1. / self.fs)
+
+    def _periodograms(self, segments):
+        segments = segments - segments.mean(axis=-1, keepdims=True)
+        spectra = np.fft.rfft(segments * self._window, axis=-1)
+        return (spectra.real ** 2 + spectra.imag ** 2).sum(axis=0)
+
+    def update(self, block):
+        """Add a block of samples.
+
+        Args:
+            block (array_like): (n, channels) samples
+        """
+        block = np.asarray(block, dtype=float)
+        if block.ndim == 1:
+            block = block[:, np.newaxis]
+        data = block if self._tail is None else np.concatenate((self._tail, block))
+        n = len(data) - self.nperseg
+        if n < 0:
+            self._tail = data
+            return
+
+        count = n // self._step + 1
+        # (segments, channels, nperseg) view, no copy
+        segments = np.lib.stride_tricks.sliding_window_view(data, self.nperseg, axis=0)[:count * self._step:self._step]
+        if self._workers > 1 and count > 1:
+            chunks = np.array_split(segments, min(self._workers, count))
+            with concurrent.futures.ThreadPoolExecutor(self._workers) as pool:
+                total = sum(pool.map(self._periodograms, chunks))
+        else:
+            total = self._periodograms(segments)
+
+        self._sum = total if self._sum is None else self._sum + total
+        self.segments += count
+        self._tail = data[count * self._step:].copy()
+
+    def merge(self, other):
+        """Add the segments of another estimator, e.g. of another part of
+        the record. Samples held for an incomplete segment are not merged.
+
+        Args:
+            other (WelchPSD): estimator with the same fs and window
+        """
+        if other.fs != self.fs or not np.array_equal(other._window, self._window):
+            raise ValueError('Expected estimator with the same fs and window.')
+        if other.segments:
+            self._sum = other._sum.copy() if self._sum is None else self._sum + other._sum
+            self.segments += other.segments
+
+    @property
+    def psd(self):
+        """Get one-sided power spectral density.
+
+        Returns:
+            numpy.ndarray: (frequencies, channels) PSD in V^2/Hz
+        """
+        if not self.segments:
+            raise RuntimeError('Not enough samples for one segment.')
+        psd = (self._sum * (self._scale / self.segments)).T
+        # DC and Nyquist bins are not doubled
+        psd[0] /= 2.
+        if self.nperseg % 2 == 0:
+            psd[-1] /= 2.
+        return psd
+
+    @property
+    def asd(self):
+        """Get one-sided amplitude spectral density.
+
+        Returns:
+            numpy.ndarray: (frequencies, channels) ASD in V/sqrt(Hz)
+        """
+        return np.sqrt(self.psd)
+
+    def noise_floor(self):
+        """Get the mean noise density per channel over the pass band of
+        the lock-in output filter (0 < f <= ENBW), or all bins above DC.
+
+        Returns:
+            numpy.ndarray: noise density in V/sqrt(Hz)
+        """
+        f = self.frequencies
+        band = (f > 0) & (f <= self.enbw) if self.enbw is not None else f > 0
+        if not band.any():
+            raise ValueError('ENBW below the frequency resolution, increase nperseg.')
+        return np.sqrt(self.psd[band].mean(axis=0))
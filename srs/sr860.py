@@ -1,4 +1,12 @@
+import math
+import time
+
 from .instr import VisaDevice
+from .ranging import AutoRanger
+
+
+class CaptureOverrun(RuntimeError):
+    """Capture data was overwritten before it was downloaded."""
 
 
 class SR860(VisaDevice):
@@ -65,13 +73,72 @@ class SR860(VisaDevice):
         'P':                (float,  None,         'OUTP? 3'),  # Get P channel amplitude
         'XYRP':             (str,    None,         'SNAPD?'),   # Get XYRP outputs simultaneously
 
+        # Auxiliary inputs and outputs
+        'aux_in_0':         (float, None,             'OAUX? 0'),     # Aux input voltage in V
+        'aux_in_1':         (float, None,             'OAUX? 1'),
+        'aux_in_2':         (float, None,             'OAUX? 2'),
+        'aux_in_3':         (float, None,             'OAUX? 3'),
+        'aux_in':           (str,   None,             'SNAP? 4, 5, 6;OAUX? 3'),  # Get all aux inputs in one message
+        'aux_out_0':        (float, 'AUXV 0, {:.4f}', 'AUXV? 0'),     # Aux output voltage in V
+        'aux_out_1':        (float, 'AUXV 1, {:.4f}', 'AUXV? 1'),
+        'aux_out_2':        (float, 'AUXV 2, {:.4f}', 'AUXV? 2'),
+        'aux_out_3':        (float, 'AUXV 3, {:.4f}', 'AUXV? 3'),
+
+        # Scan engine
+        'scan_param':       (int,   'SCNPAR {}',      'SCNPAR?'),      # Scanned parameter
+        'scan_log':         (bool,  'SCNLOG {}',      'SCNLOG?'),      # Logarithmic scan
+        'scan_end':         (int,   'SCNEND {}',      'SCNEND?'),      # End mode: up, repeat, up/down
+        'scan_time':        (int,   'SCNSEC {}',      'SCNSEC?'),      # Scan time in s
+        'scan_interval':    (int,   'SCNINRVL {}',    'SCNINRVL?'),    # Parameter update interval
+        'scan_aux_0_begin': (float, 'SCNAUX1 0, {:.4f}', 'SCNAUX1? 0'),  # Aux output 0 begin voltage in V
+        'scan_aux_0_end':   (float, 'SCNAUX1 1, {:.4f}', 'SCNAUX1? 1'),  # Aux output 0 end voltage in V
+        'scan_aux_1_begin': (float, 'SCNAUX2 0, {:.4f}', 'SCNAUX2? 0'),
+        'scan_aux_1_end':   (float, 'SCNAUX2 1, {:.4f}', 'SCNAUX2? 1'),
+        'scan_enable':      (bool,  'SCNENBL {}',     'SCNENBL?'),     # Scan enabled, parameter at begin
+        'scan_run':         ((),    'SCNRUN',         None),           # Start scan
+        'scan_state':       (int,   None,             'SCNSTATE?'),    # Off, reset, running, paused, done
+
+        # Capture buffer
+        'capture_length':   (int,   'CAPTURELEN {}',  'CAPTURELEN?'),      # Capture buffer length in kB
+        'capture_config':   (int,   'CAPTURECFG {}',  'CAPTURECFG?'),      # Captured channels
+        'capture_rate_n':   (int,   'CAPTURERATE {}', None),               # Capture rate = max rate / 2^n
+        'capture_rate':     (float, None,             'CAPTURERATE?'),     # Capture rate in Hz
+        'capture_rate_max': (float, None,             'CAPTURERATEMAX?'),  # Maximum capture rate in Hz
+        'capture_start':    ((int, int), 'CAPTURESTART {}, {}', None),     # Start capture (mode, trigger)
+        'capture_stop':     ((),    'CAPTURESTOP',    None),               # Stop capture
+        'capture_progress': (int,   None,             'CAPTUREPROG?'),     # Capture progress in kB
+        'capture_get':      ((int, int), None,        'CAPTUREGET? {}, {}'),  # Get binary block (offset, length) in kB
+
         # Instrument functions
         'model_type':       (str,   None,          '*IDN?'),
+        'operation_complete': (int, None,          '*OPC?'),    # Answered once preceding commands are done
         'reset':            ((),    '*RST',        None)
     }
 
-    def __init__(self, devpath):
-        super().__init__(devpath)
+    _slow_requests = ('*RST', 'ARNG', 'ASCL', 'APHS', 'OAUT')
+    _constant_reads = ('model_type',)
+    _invalidates = {
+        'reset':            None,
+        'auto_range':       ('V_input_range',),
+        'auto_scale':       ('sensitivity',),
+        'auto_phase':       ('phase',),
+        'auto_offset_X':    ('X_offset', 'X_offset_enable'),
+        'auto_offset_Y':    ('Y_offset', 'Y_offset_enable'),
+        'auto_offset_R':    ('R_offset', 'R_offset_enable'),
+        'capture_start':    (),
+        'capture_stop':     (),
+        'scan_run':         ('frequency', 'amplitude', 'dc_offset', 'aux_out_0', 'aux_out_1'),
+    }
+
+    def __init__(self, devpath, **kwargs):
+        """
+        Args:
+            devpath (str): VISA resource name
+            **kwargs: retry and timeout settings, see VisaDevice
+        """
+        super().__init__(devpath, **kwargs)
+        # time (s, epoch) right after the last capture start was written
+        self.capture_started = None
         self._model = None
         self._model = self.model
         self._serial_num = self.serial_number
@@ -159,6 +226,26 @@ class SR860(VisaDevice):
         """Resets instrument to default settings. NOT the same as initialize."""
         self.write('reset')
 
+    def settings_snapshot(self):
+        """Get the settings needed to interpret acquired data,
+        e.g. to store as file attributes or for srs.processing.calibrate().
+
+        Returns:
+            dict: time constant in s, sensitivity in V or uA, frequency in Hz,
+                input mode, and XYR offsets in percent, offset enables and expands
+        """
+        settings = {
+            'time_constant': self.time_constant,
+            'sensitivity': self.sensitivity,
+            'frequency': self.frequency,
+            'input_mode': self.input_mode,
+            }
+        for channel in ('X', 'Y', 'R'):
+            settings[channel + '_offset'] = getattr(self, channel + '_offset')
+            settings[channel + '_offset_enable'] = getattr(self, channel + '_offset_enable')
+            settings[channel + '_expand'] = getattr(self, channel + '_expand')
+        return settings
+
     @property
     def frequency_range(self):
         """Get frequency range in Hz.
@@ -481,6 +568,22 @@ class SR860(VisaDevice):
             raise ValueError('Expected float in set: {}.'.format(sens_range))
         self.write('sensitivity', sens_range.index(value))
 
+    def auto_ranger(self, upper=0.9, lower=0.3, dwell=None, settle=5):
+        """Get a client-side auto-ranger for the sensitivity.
+        Faster and less disruptive than auto_range() / auto_scale().
+
+        Args:
+            upper (float): upper fraction of full scale
+            lower (float): lower fraction of full scale
+            dwell (float): minimum time in s before ranging to a more
+                sensitive range. Defaults to the settling time.
+            settle (float): settling time in number of time constants
+
+        Returns:
+            AutoRanger: auto-ranger fed with acquired R values
+        """
+        return AutoRanger(self, upper, lower, dwell, settle)
+
     @property
     def filter_slopes(self):
         """List filter slopes in dB/oct.
@@ -579,6 +682,36 @@ class SR860(VisaDevice):
             raise ValueError('Expected float in set: {}.'.format(times))
         self.write('time_constant', times.index(value))
 
+    def settle_time(self, time_constant=None, filter_slope=None):
+        """Get output filter settling time (to 99%) in second.
+
+        Args:
+            time_constant (float): time constant in second, defaults to the current one
+            filter_slope (int): filter slope in dB/oct, defaults to the current one
+
+        Returns:
+            float: settling time in second
+        """
+        time_constant = self.time_constant if time_constant is None else time_constant
+        filter_slope = self.filter_slope if filter_slope is None else filter_slope
+        return {6: 5, 12: 7, 18: 9, 24: 10}[filter_slope] * time_constant
+
+    def sample_interval(self, time_constant=None, filter_slope=None):
+        """Get interval between uncorrelated output samples, 1 / (2 ENBW), in second.
+
+        Args:
+            time_constant (float): time constant in second, defaults to the current one
+            filter_slope (int): filter slope in dB/oct, defaults to the current one
+
+        Returns:
+            float: sample interval in second
+        """
+        time_constant = self.time_constant if time_constant is None else time_constant
+        filter_slope = self.filter_slope if filter_slope is None else filter_slope
+        # ENBW = factor / time constant
+        enbw_factor = {6: 1 / 4, 12: 1 / 8, 18: 3 / 32, 24: 5 / 64}[filter_slope]
+        return time_constant / (2 * enbw_factor)
+
     @property
     def input_coupling_modes(self):
         """List input coupling modes.
@@ -1055,4 +1188,564 @@ class SR860(VisaDevice):
             float: XYRP output amplitudes
         """
         outputs = self.read('XYRP').split(',')  # type str
-        return (float(output) for output in outputs)
\ No newline at end of file
+        return (float(output) for output in outputs)
+
+    def poller(self, rate, capacity=100000, deferred=False):
+        """Get a fixed-rate XYRP poller running on a dedicated thread.
+
+        Args:
+            rate (float): target poll rate in Hz
+            capacity (int): number of samples held in the ring buffer
+            deferred (bool): only store raw responses while polling,
+                parse them afterwards with Poller.parse()
+
+        Returns:
+            Poller: poller, started with start() or as context manager
+        """
+        from .poller import Poller  # imports NumPy
+        return Poller(self, rate, capacity, deferred)
+
+    def coalesce(self, max_rate=50.):
+        """Get a writer sending only the latest value of rapidly changing
+        setpoints, e.g. from GUI sliders or feedback loops.
+
+        Args:
+            max_rate (float): maximum number of messages per second
+
+        Returns:
+            CoalescingWriter: writer, started with start() or as context manager
+        """
+        from .coalesce import CoalescingWriter
+        return CoalescingWriter(self, max_rate)
+
+    def resonance_tracker(self, kp, ki, setpoint=None, rate=None, limits=None, capacity=100000):
+        """Get a PI loop tracking a resonance by its phase on a dedicated thread.
+
+        Args:
+            kp (float): proportional gain in Hz/deg
+            ki (float): integral gain in Hz/(deg s)
+            setpoint (float): phase setpoint in deg, defaults to the phase at start
+            rate (float): update rate in Hz, defaults to 1 / sample_interval(), at most 50 Hz
+            limits (tuple): (min, max) frequency in Hz
+            capacity (int): number of updates held in the log
+
+        Returns:
+            ResonanceTracker: tracker, started with start() or as context manager
+        """
+        from .tracking import ResonanceTracker  # imports NumPy
+        return ResonanceTracker(self, kp, ki, setpoint, rate, limits, capacity)
+
+    def adaptive_measure(self, target, channel='R', initial_samples=10, max_samples=10000):
+        """Measure XYRP to a target relative uncertainty in the shortest time.
+
+        The noise is estimated from an initial window of uncorrelated samples
+        at the current time constant. Assuming white noise, the output noise
+        scales with 1 / sqrt(time constant), so the number of samples needed
+        at each time constant follows, with samples taken no faster than
+        sample_interval() or the bus allows. The time constant with the
+        shortest settling plus averaging time is applied and the measurement
+        continues until the standard error of channel reaches the target.
+        Staying at the current time constant needs no settling and keeps
+        the initial window, so only its remaining samples are counted.
+
+        Args:
+            target (float): target relative standard error of channel
+            channel (str): 'X', 'Y', 'R' or 'P'
+            initial_samples (int): number of samples of the initial window
+            max_samples (int): maximum number of samples
+
+        Returns:
+            dict: mean and standard_error (numpy.ndarray of XYRP),
+                time_constant in second and number of samples
+
+        Raises:
+            ValueError: If the target can not be reached within max_samples.
+        """
+        from .statistics import RunningStats  # imports NumPy
+
+        c = 'XYRP'.index(channel)
+        slope = self.filter_slope
+        tau0 = self.time_constant
+        interval = self.sample_interval(tau0, slope)
+
+        stats = RunningStats(4)
+        latency = 0.
+        for _ in range(max(initial_samples, 2)):
+            t = time.perf_counter()
+            stats.update(tuple(self.XYRP_outputs()))
+            latency = max(latency, time.perf_counter() - t)
+            time.sleep(interval)
+        mean, sigma0 = abs(stats.mean[c]), stats.std[c]
+        if mean == 0:
+            raise ValueError('Relative uncertainty undefined for zero mean.')
+
+        candidates = []
+        for tau in self.time_constants:
+            samples = max(math.ceil((sigma0 * (tau0 / tau) ** 0.5 / (target * mean)) ** 2), 2)
+            if samples > max_samples:
+                continue
+            if tau == tau0:
+                # no settling, and the initial window is kept
+                duration = max(samples - stats.count, 0) * max(interval, latency)
+            else:
+                duration = self.settle_time(tau, slope) + samples * max(self.sample_interval(tau, slope), latency)
+            candidates.append((duration, tau, samples))
+        if not candidates:
+            raise ValueError('Target not reachable within {} samples.'.format(max_samples))
+        _, tau, samples = min(candidates)
+
+        if tau != tau0:
+            self.time_constant = tau
+            time.sleep(self.settle_time(tau, slope))
+            stats = RunningStats(4)
+        interval = max(self.sample_interval(tau, slope) - latency, 0.)
+        while stats.count < max_samples and (stats.count < samples or stats.standard_error[c] > target * mean):
+            stats.update(tuple(self.XYRP_outputs()))
+            mean = abs(stats.mean[c])
+            time.sleep(interval)
+
+        return {
+            'mean': stats.mean,
+            'standard_error': stats.standard_error,
+            'time_constant': tau,
+            'samples': stats.count,
+            }
+
+    def harmonic_scan(self, harmonics, amplitudes=None, settle=None):
+        """Measure XYRP at several harmonics (and drive amplitudes).
+
+        The snapshot query of each point and the settings of the next point
+        are sent in one message, so every point costs a single round-trip
+        plus the settling time. Harmonic and amplitude are restored at the end.
+
+        Args:
+            harmonics (iterable): harmonic numbers
+            amplitudes (iterable): drive amplitudes in V, defaults to the current one
+            settle (float): settling time per point in second, defaults to settle_time()
+
+        Returns:
+            numpy.ndarray: (amplitudes, harmonics, 4) XYRP outputs
+
+        Raises:
+            ValueError: If no harmonics or amplitudes are given, or a
+                harmonic detection frequency is out of range.
+        """
+        import numpy as np
+
+        harmonics = list(harmonics)
+        if not harmonics:
+            raise ValueError('Expected at least one harmonic.')
+        for h in harmonics:
+            if not isinstance(h, int) or not 1 <= h <= 99:
+                raise ValueError('Expected int between 1 and 99.')
+        # the detection frequency scales with the harmonic
+        f_range = self.frequency_range
+        if f_range is not None:
+            frequency = self.frequency
+            for h in harmonics:
+                if h * frequency > f_range['stop Hz']:
+                    raise ValueError('Harmonic {} detects at {:.3f} Hz, above {:.3f} Hz.'.format(
+                        h, h * frequency, f_range['stop Hz']))
+
+        restore = [('harmonic', self.harmonic)]
+        if amplitudes is None:
+            amplitudes = [None]
+        else:
+            amplitudes = list(amplitudes)
+            if not amplitudes:
+                raise ValueError('Expected at least one amplitude.')
+            for a in amplitudes:
+                self._isNumber(a)
+                if self.model is not None and not 1.e-9 <= a <= 2.0:
+                    raise ValueError('Expected float in range [{:.9f}, {:.2f}] V.'.format(1.e-9, 2.0))
+            restore.append(('amplitude', self.amplitude))
+        settle = self.settle_time() if settle is None else settle
+
+        def settings(i, j):
+            commands = [('harmonic', harmonics[j])]
+            if j == 0 and amplitudes[i] is not None:
+                commands.insert(0, ('amplitude', amplitudes[i]))
+            return commands
+
+        points = [(i, j) for i in range(len(amplitudes)) for j in range(len(harmonics))]
+        data = np.empty((len(amplitudes), len(harmonics), 4))
+        try:
+            self.batch_write(*settings(*points[0]))
+            for k, (i, j) in enumerate(points):
+                time.sleep(settle)
+                following = settings(*points[k + 1]) if k + 1 < len(points) else restore
+                data[i, j] = self._query_with_writes(self.API['XYRP'][2], *following).split(',')
+        except BaseException:
+            # the settings are otherwise only restored with the last query
+            self.batch_write(*restore)
+            raise
+        return data
+
+    def aux_input(self, channel):
+        """Get an aux input voltage in V.
+
+        Args:
+            channel (int): aux input 0 to 3
+
+        Returns:
+            float: voltage in V
+        """
+        if channel not in range(4):
+            raise ValueError('Expected int between 0 and 3.')
+        return self.read('aux_in_{}'.format(channel))
+
+    def read_aux(self):
+        """Get all four aux input voltages in a single round-trip.
+
+        Returns:
+            tuple: Tuple of float of aux input 0 to 3 voltages in V.
+        """
+        return tuple(float(value) for value in self.read('aux_in').replace(';', ',').split(','))
+
+    @property
+    def aux_output_range(self):
+        """Get aux output range.
+
+        Returns:
+            str: range
+        """
+        return None if self.model is None else 'min: -10.5 V, max: 10.5 V, resolution: 1.e-3 V.'
+
+    def aux_output(self, channel):
+        """Get an aux output voltage in V.
+
+        Args:
+            channel (int): aux output 0 to 3
+
+        Returns:
+            float: voltage in V
+        """
+        if channel not in range(4):
+            raise ValueError('Expected int between 0 and 3.')
+        return self.read('aux_out_{}'.format(channel))
+
+    def _check_aux_output(self, channel, value):
+        if channel not in range(4):
+            raise ValueError('Expected int between 0 and 3.')
+        self._isNumber(value)
+        if self.model is not None and not -10.5 <= value <= 10.5:
+            raise ValueError('Expected float in range [-10.5, 10.5] V.')
+
+    def set_aux_output(self, channel, value):
+        """Set an aux output voltage in V.
+
+        Args:
+            channel (int): aux output 0 to 3
+            value (float): voltage in V
+        """
+        self._check_aux_output(channel, value)
+        self.write('aux_out_{}'.format(channel), value)
+
+    @property
+    def scan_intervals(self):
+        """List scan parameter update intervals.
+
+        Returns:
+            tuple: Tuple of float of update intervals in s.
+        """
+        return (0.008, 0.016, 0.031, 0.063, 0.125, 0.25, 0.5, 1., 2., 4., 8., 16., 32., 64., 128., 256., 512.)
+
+    def ramp_aux_outputs(self, targets, rate, interval=0.01):
+        """Ramp aux outputs linearly to target voltages.
+
+        A single ramp of aux output 0 or 1 runs on the scan engine of the
+        instrument, so the host only configures and starts it and waits
+        for it to finish. The scan time is rounded up to whole seconds and
+        the update interval down to one of scan_intervals, so the ramp is
+        never faster than rate. The scan engine is left disabled with the
+        output at its target.
+
+        Outputs 2 and 3, several outputs at once, or unknown models are
+        ramped by the host: steps are written on a fixed deadline
+        schedule, each setting all ramped outputs in one message without
+        waiting for a response.
+
+        Args:
+            targets (dict): target voltage in V per aux output 0 to 3
+            rate (float): ramp rate in V/s
+            interval (float): time between steps in s
+        """
+        if not rate > 0:
+            raise ValueError('Expected rate > 0 V/s.')
+        channels = sorted(targets)
+        for channel in channels:
+            self._check_aux_output(channel, targets[channel])
+        if not channels:
+            return
+        request = ';'.join(self.API['aux_out_{}'.format(channel)][2] for channel in channels)
+        starts = [float(value) for value in self._query(request).split(';')]
+
+        if self.model is not None and len(channels) == 1 and channels[0] in (0, 1):
+            self._scan_aux_output(channels[0], starts[0], targets[channels[0]], rate, interval)
+            return
+
+        steps = math.ceil(max(abs(targets[c] - v) for c, v in zip(channels, starts)) / (rate * interval))
+        start = time.perf_counter()
+        for k in range(1, steps + 1):
+            delay = start + k * interval - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            fraction = k / steps
+            self.batch_write(*(('aux_out_{}'.format(c), v + (targets[c] - v) * fraction)
+                               for c, v in zip(channels, starts)))
+
+    def _scan_aux_output(self, channel, begin, end, rate, interval):
+        """Ramp aux output 0 or 1 on the scan engine and wait until done."""
+        duration = max(math.ceil(abs(end - begin) / rate), 1)
+        intervals = self.scan_intervals
+        # longest update interval not above the requested one
+        index = max([0] + [i for i, value in enumerate(intervals) if value <= interval])
+        name = 'scan_aux_{}'.format(channel)
+        self.batch_write(('scan_enable', False),
+                         ('scan_param', 3 + channel),  # aux output 1 or 2 on the front panel
+                         ('scan_log', False),
+                         ('scan_end', 0),              # single scan up
+                         (name + '_begin', begin),
+                         (name + '_end', end),
+                         ('scan_time', duration),
+                         ('scan_interval', index),
+                         ('scan_enable', True))
+        output = 'aux_out_{}'.format(channel)
+        try:
+            self.write('scan_run')
+            time.sleep(duration)
+            while self.read('scan_state') == 2:  # running
+                time.sleep(max(intervals[index], 0.05))
+        except BaseException:
+            # stop where the ramp was interrupted
+            self.batch_write(('scan_enable', False), (output, self.read(output)))
+            raise
+        self.batch_write(('scan_enable', False), (output, end))
+
+    @property
+    def capture_configs(self):
+        """List capture configurations (captured channels).
+
+        Returns:
+            tuple: Tuple of str of capture configurations.
+        """
+        return ('X', 'XY', 'RT', 'XYRT')
+
+    @property
+    def capture_config(self):
+        """Get capture configuration.
+
+        Returns:
+            str: capture configuration
+        """
+        return self.capture_configs[self.read('capture_config')]
+
+    @capture_config.setter
+    def capture_config(self, value):
+        """Set capture configuration.
+
+        Args:
+            value (str): capture configuration
+        """
+        configs = self.capture_configs
+        if value not in configs:
+            raise ValueError('Expected str in set: {}.'.format(configs))
+        self.write('capture_config', configs.index(value))
+
+    @property
+    def capture_length(self):
+        """Get capture buffer length in kB.
+
+        Returns:
+            int: capture buffer length in kB
+        """
+        return self.read('capture_length')
+
+    @capture_length.setter
+    def capture_length(self, value):
+        """Set capture buffer length in kB.
+
+        Args:
+            value (int): capture buffer length in kB
+        """
+        if not isinstance(value, int) or not 1 <= value <= 4096:
+            raise ValueError('Expected int between 1 and 4096.')
+        self.write('capture_length', value)
+
+    @property
+    def capture_rates(self):
+        """List capture rates in Hz.
+
+        Returns:
+            tuple: Tuple of float of capture rates in Hz.
+        """
+        rate_max = self.read('capture_rate_max')
+        return tuple(rate_max / 2 ** n for n in range(21))
+
+    @property
+    def capture_rate(self):
+        """Get capture rate in Hz.
+
+        Returns:
+            float: capture rate in Hz
+        """
+        return self.read('capture_rate')
+
+    @capture_rate.setter
+    def capture_rate(self, value):
+        """Set capture rate in Hz.
+
+        Args:
+            value (float): capture rate in Hz
+        """
+        rates = self.capture_rates
+        if value not in rates:
+            raise ValueError('Expected float in set: {}.'.format(rates))
+        self.write('capture_rate_n', rates.index(value))
+
+    @property
+    def capture_modes(self):
+        """List capture modes.
+
+        Returns:
+            tuple: Tuple of str of capture modes.
+        """
+        return ('one shot', 'continuous')
+
+    @property
+    def capture_triggers(self):
+        """List capture trigger modes.
+
+        Returns:
+            tuple: Tuple of str of capture trigger modes.
+        """
+        return ('immediate', 'trigger start', 'sample per trigger')
+
+    @property
+    def capture_progress(self):
+        """Get number of kB written to the capture buffer.
+
+        Returns:
+            int: capture progress in kB
+        """
+        return self.read('capture_progress')
+
+    def capture_start(self, mode='one shot', trigger='immediate'):
+        """Start capture.
+
+        The time right after the command was written is stored in
+        capture_started (s, epoch).
+
+        Args:
+            mode (str): capture mode
+            trigger (str): capture trigger mode
+        """
+        modes, triggers = self.capture_modes, self.capture_triggers
+        if mode not in modes:
+            raise ValueError('Expected str in set: {}.'.format(modes))
+        if trigger not in triggers:
+            raise ValueError('Expected str in set: {}.'.format(triggers))
+        self.write('capture_start', modes.index(mode), triggers.index(trigger))
+        self.capture_started = time.time()
+
+    def capture_stop(self):
+        """Stop capture."""
+        self.write('capture_stop')
+
+    def capture_get(self, offset, length):
+        """Download part of the capture buffer.
+
+        Args:
+            offset (int): offset in kB
+            length (int): length in kB, at most 64
+
+        Returns:
+            numpy.ndarray: float32 values in capture order
+        """
+        import numpy as np
+
+        if not 1 <= length <= 64:
+            raise ValueError('Expected int between 1 and 64.')
+        request = self.API['capture_get'][2].format(offset, length)
+        return self._query_binary(request, container=np.array)
+
+    def capture_read(self, length=None):
+        """Download the capture buffer from the start, e.g. after a one
+        shot capture has completed.
+
+        Args:
+            length (int): length in kB, defaults to the capture length
+
+        Returns:
+            numpy.ndarray: (samples, channels) float32 values
+        """
+        import numpy as np
+
+        length = self.capture_length if length is None else length
+        channels = len(self.capture_config)
+        blocks = [self.capture_get(offset, min(64, length - offset)) for offset in range(0, length, 64)]
+        return np.concatenate(blocks).reshape(-1, channels)
+
+    def capture_stream(self, length=256, config='XYRT', rate=None, poll_interval=None):
+        """Capture continuously and download newly filled kB blocks
+        while the instrument keeps acquiring.
+
+        The capture buffer is used as a ring: new data is located from
+        the capture progress and downloaded in blocks of at most 64 kB,
+        split at the end of the buffer. The amount written by the
+        instrument since the last progress poll is estimated from the
+        capture rate, and an overrun is raised before a block could be
+        overwritten while it is downloaded. Capture is stopped when the
+        generator is closed. The capture starts on the first iteration,
+        its start time is then available as capture_started.
+
+        Args:
+            length (int): capture buffer length in kB
+            config (str): capture configuration
+            rate (float): capture rate in Hz, defaults to the current rate
+            poll_interval (float): progress poll interval in s, defaults
+                to a quarter of the buffer fill time (at most 0.1 s)
+
+        Yields:
+            numpy.ndarray: (samples, channels) float32 block
+
+        Raises:
+            CaptureOverrun: If data was overwritten before it was downloaded.
+        """
+        self.capture_stop()
+        self.capture_config = config
+        self.capture_length = length
+        if rate is not None:
+            self.capture_rate = rate
+        channels = len(config)
+        rate = 4 * channels * self.capture_rate / 1024  # kB/s
+        fill_time = length / rate
+        if poll_interval is None:
+            poll_interval = min(fill_time / 4, 0.1)
+        # allowance for the latency of the progress query and rate rounding
+        limit = length - max(length / 8, 1)
+
+        def check(backlog, since):
+            # backlog plus the data written since the progress poll
+            if backlog + (time.monotonic() - since) * rate >= limit:
+                raise CaptureOverrun('Capture buffer overrun: increase length or decrease poll_interval.')
+
+        self.capture_start('continuous', 'immediate')
+        try:
+            position = 0
+            polled_at = time.monotonic()
+            while True:
+                time.sleep(poll_interval)
+                # everything up to the previous progress has been downloaded,
+                # also rules out a full lap that shows as no new data
+                check(0, polled_at)
+                polled_at = time.monotonic()
+                new = (self.capture_progress - position) % length
+                while new > 0:
+                    check(new, polled_at)
+                    n = min(new, 64, length - position)
+                    yield self.capture_get(position, n).reshape(-1, channels)
+                    position = (position + n) % length
+                    new -= n
+        finally:
+            self.capture_stop()
@@ -0,0 +1,203 @@
+import numpy as np
+
+
+class RunningStats:
+    """Running mean and variance per channel (Welford / Chan et al.).
+
+    Samples or blocks are folded in with O(1) memory, so a measurement can
+    be stopped as soon as the standard error reaches its target.
+
+    Example:
+        stats = RunningStats(4)
+        while True:
+            stats.update(tuple(lia.XYRP_outputs()))
+            if stats.count > 10 and stats.standard_error[2] < 1e-9:
+                break
+    """
+
+    def __init__(self, channels):
+        """
+        Args:
+            channels (int): number of channels
+        """
+        self.count = 0
+        self.mean = np.zeros(channels)
+        self._m2 = np.zeros(channels)
+
+    def update(self, block):
+        """Add a sample or block of samples.
+
+        Args:
+            block (array_like): sample (channels,) or block (n, channels)
+        """
+        block = np.asarray(block, dtype=float)
+        if block.ndim == 1:
+            block = block[np.newaxis]
+        n = len(block)
+        if n == 0:
+            return
+        mean = block.mean(axis=0)
+        m2 = ((block - mean) ** 2).sum(axis=0)
+        self._combine(n, mean, m2)
+
+    def merge(self, other):
+        """Add the samples of another RunningStats.
+
+        Args:
+            other (RunningStats): statistics of the same channels
+        """
+        if other.count:
+            self._combine(other.count, other.mean, other._m2)
+
+    def _combine(self, n, mean, m2):
+        count = self.count + n
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (n / count)
+        self._m2 = self._m2 + m2 + delta ** 2 * (self.count * n / count)
+        self.count = count
+
+    @property
+    def variance(self):
+        """Get sample variance per channel.
+
+        Returns:
+            numpy.ndarray: variance
+        """
+        if self.count < 2:
+            return np.full_like(self.mean, np.nan)
+        return self._m2 / (self.count - 1)
+
+    @property
+    def std(self):
+        """Get sample standard deviation per channel.
+
+        Returns:
+            numpy.ndarray: standard deviation
+        """
+        return np.sqrt(self.variance)
+
+    @property
+    def standard_error(self):
+        """Get standard error of the mean per channel,
+        assuming uncorrelated samples.
+
+        Returns:
+            numpy.ndarray: standard error
+        """
+        return self.std / np.sqrt(max(self.count, 1))
+
+
+class AllanDeviation:
+    """Running overlapping Allan deviation per channel at octave taus.
+
+    Only the last 2 * 2**(octaves - 1) + 1 cumulative sums are kept, so
+    memory does not grow with the number of samples.
+    """
+
+    def __init__(self, channels, tau0, octaves=10):
+        """
+        Args:
+            channels (int): number of channels
+            tau0 (float): sample interval in s
+            octaves (int): number of taus, tau0 * 2**k for k < octaves
+        """
+        self.tau0 = tau0
+        self._m = 2 ** np.arange(octaves)
+        self._history = np.zeros((0, channels))
+        self._total = np.zeros(channels)
+        self._sum2 = np.zeros((octaves, channels))
+        self._terms = np.zeros(octaves, dtype=int)
+
+    @property
+    def taus(self):
+        """Get averaging times in s.
+
+        Returns:
+            numpy.ndarray: taus
+        """
+        return self.tau0 * self._m
+
+    def update(self, block):
+        """Add a sample or block of samples.
+
+        Args:
+            block (array_like): sample (channels,) or block (n, channels)
+        """
+        block = np.asarray(block, dtype=float)
+        if block.ndim == 1:
+            block = block[np.newaxis]
+        if not len(block):
+            return
+        # cumulative sums of the kept history followed by the new samples
+        sums = np.concatenate((self._history, self._total + np.cumsum(block, axis=0)))
+        if not len(self._history):
+            sums = np.concatenate((np.zeros((1, block.shape[1])), sums))
+        new = len(sums) - len(self._history)
+        for k, m in enumerate(self._m):
+            # second differences ending at the new samples
+            start = max(len(sums) - new, 2 * m)
+            if start >= len(sums):
+                continue
+            end = np.arange(start, len(sums))
+            d = sums[end] - 2 * sums[end - m] + sums[end - 2 * m]
+            self._sum2[k] += (d ** 2).sum(axis=0) / m ** 2
+            self._terms[k] += len(end)
+        self._total = sums[-1]
+        self._history = sums[-(2 * self._m[-1] + 1):]
+
+    @property
+    def adev(self):
+        """Get overlapping Allan deviation per tau and channel.
+
+        Returns:
+            numpy.ndarray: (taus, channels) Allan deviation, nan where
+                not enough samples have been added
+        """
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.sqrt(self._sum2 / (2 * self._terms[:, np.newaxis]))
+
+
+class OutlierFilter:
+    """Robust outlier rejection (Hampel filter) per channel.
+
+    Samples further than threshold scaled median absolute deviations from
+    the median of a window of recent samples are rejected. The window
+    holds all recent samples, including rejected ones, so the filter
+    follows a real level change (e.g. after a range or setpoint change)
+    once it makes up half of the window.
+    """
+
+    def __init__(self, channels, window=64, threshold=5.):
+        """
+        Args:
+            channels (int): number of channels
+            window (int): number of recent samples kept
+            threshold (float): rejection threshold in standard deviations
+        """
+        self.threshold = threshold
+        self._window = np.zeros((0, channels))
+        self._size = window
+        self.rejected = 0
+
+    def filter(self, block):
+        """Get the samples of a block that are not outliers in any channel.
+
+        Args:
+            block (array_like): sample (channels,) or block (n, channels)
+
+        Returns:
+            numpy.ndarray: (m, channels) accepted samples
+        """
+        block = np.asarray(block, dtype=float)
+        if block.ndim == 1:
+            block = block[np.newaxis]
+        reference = self._window if len(self._window) >= 3 else block
+        median = np.median(reference, axis=0)
+        # 1.4826 * MAD estimates the standard deviation of normal noise
+        sigma = 1.4826 * np.median(np.abs(reference - median), axis=0)
+        # channels with a constant reference can not be judged
+        sigma[sigma == 0] = np.inf
+        accepted = (np.abs(block - median) <= self.threshold * sigma).all(axis=1)
+        self.rejected += len(block) - int(accepted.sum())
+        self._window = np.concatenate((self._window, block))[-self._size:]
+        return block[accepted]
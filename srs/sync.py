@@ -0,0 +1,127 @@
+import concurrent.futures
+import time
+
+import numpy as np
+
+
+class SyncCapture:
+    """Capture on several SR860s started by one hardware trigger.
+
+    All instruments are configured with the same capture configuration,
+    length and rate and armed in one shot mode with trigger start, so
+    every buffer starts on the same edge at the rear panel trigger input
+    and the samples are aligned to within one sample period, independent
+    of the bus latency. Buffers are downloaded in parallel.
+
+    Example:
+        sync = SyncCapture([lia1, lia2, lia3], length=256, config='XY', rate=19531.25)
+        data = sync.acquire(trigger=function_generator.fire)
+        X = data[:, :, 0]   # (instrument, sample)
+    """
+
+    def __init__(self, lias, length=256, config='XYRT', rate=None):
+        """
+        Args:
+            lias (list): SR860 instances sharing the trigger signal
+            length (int): capture buffer length in kB
+            config (str): capture configuration
+            rate (float): capture rate in Hz, defaults to the current
+                rate of the first instrument
+        """
+        if not lias:
+            raise ValueError('Expected at least one instrument.')
+        self._lias = list(lias)
+        self._length = length
+        self._config = config
+        self._rate = rate
+        self._pool = concurrent.futures.ThreadPoolExecutor(len(self._lias))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Stop the download threads."""
+        self._pool.shutdown()
+
+    @property
+    def rate(self):
+        """Get the capture rate in Hz.
+
+        Returns:
+            float: capture rate in Hz
+        """
+        return self._rate
+
+    def _map(self, function):
+        return list(self._pool.map(function, self._lias))
+
+    def arm(self):
+        """Configure all instruments and wait for the trigger. Returns once
+        every instrument has executed the capture start, so a trigger fired
+        afterwards is seen by all of them."""
+        if self._rate is None:
+            self._rate = self._lias[0].capture_rate
+
+        def arm(lia):
+            lia.capture_stop()
+            lia.capture_config = self._config
+            lia.capture_length = self._length
+            lia.capture_rate = self._rate
+            lia.capture_start('one shot', 'trigger start')
+            # a written command may still be queued, *OPC? is only answered
+            # once it has been executed
+            lia.read('operation_complete')
+        self._map(arm)
+
+    def wait(self, timeout=None, poll_interval=None):
+        """Wait until all buffers are full.
+
+        Args:
+            timeout (float): maximum waiting time in s, unlimited if None
+            poll_interval (float): progress poll interval in s, defaults to
+                a tenth of the buffer fill time (at most 0.1 s)
+
+        Raises:
+            RuntimeError: If the buffers are not full within the timeout.
+        """
+        fill_time = self._length * 1024 / (4 * len(self._config) * self._rate)
+        if poll_interval is None:
+            poll_interval = min(fill_time / 10, 0.1)
+        start = time.monotonic()
+        pending = list(self._lias)
+        while True:
+            pending = [lia for lia in pending if lia.capture_progress < self._length]
+            if not pending:
+                return
+            if timeout is not None and time.monotonic() - start > timeout:
+                raise RuntimeError('{} of {} captures not complete within {} s.'.format(
+                    len(pending), len(self._lias), timeout))
+            time.sleep(poll_interval)
+
+    def read(self):
+        """Download all buffers in parallel.
+
+        Returns:
+            numpy.ndarray: (instrument, sample, channel) float32 array
+        """
+        return np.stack(self._map(lambda lia: lia.capture_read(self._length)))
+
+    def acquire(self, trigger=None, timeout=None):
+        """Arm, trigger, wait and download.
+
+        Args:
+            trigger (callable): fires the trigger signal once all
+                instruments are armed, None to wait for an external trigger
+            timeout (float): maximum waiting time for the buffers in s
+
+        Returns:
+            numpy.ndarray: (instrument, sample, channel) float32 array
+        """
+        self.arm()
+        if trigger is not None:
+            trigger()
+        self.wait(timeout)
+        return self.read()
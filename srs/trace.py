@@ -0,0 +1,150 @@
+import base64
+import json
+import struct
+import time
+
+
+class TraceRecorder:
+    """Transport wrapper logging every command, response and its timing.
+
+    Records are written as one JSON object per line (NDJSON) with the keys
+    op ('w' write, 'r' read, 'b' binary query, 'c' clear), t (time since
+    the start of the trace in s), dt (duration in s) and data (command or
+    response). Binary query values are stored base64-encoded (key b64).
+    Enabled with the trace argument of VisaDevice / SR860.
+    """
+
+    def __init__(self, dev, file):
+        """
+        Args:
+            dev: pyvisa resource
+            file: text file the trace is written to
+        """
+        self._dev = dev
+        self._file = file
+        self._start = time.perf_counter()
+
+    @property
+    def timeout(self):
+        return self._dev.timeout
+
+    @timeout.setter
+    def timeout(self, value):
+        self._dev.timeout = value
+
+    def _log(self, op, t, data, **kwargs):
+        record = {'op': op, 't': round(t - self._start, 6), 'dt': round(time.perf_counter() - t, 6), 'data': data}
+        record.update(kwargs)
+        self._file.write(json.dumps(record, separators=(',', ':')) + '\n')
+
+    def write(self, data):
+        t = time.perf_counter()
+        ret = self._dev.write(data)
+        self._log('w', t, data)
+        return ret
+
+    def read(self, **kwargs):
+        t = time.perf_counter()
+        data = self._dev.read(**kwargs)
+        self._log('r', t, data)
+        return data
+
+    def read_raw(self):
+        t = time.perf_counter()
+        data = self._dev.read_raw()
+        self._log('r', t, data.decode('utf-8'))
+        return data
+
+    def query_binary_values(self, data, datatype='f', is_big_endian=False, container=list):
+        t = time.perf_counter()
+        values = self._dev.query_binary_values(data, datatype=datatype, is_big_endian=is_big_endian, container=container)
+        packed = struct.pack('{}{}{}'.format('>' if is_big_endian else '<', len(values), datatype), *values)
+        self._log('b', t, data, fmt=datatype, b64=base64.b64encode(packed).decode('ascii'))
+        return values
+
+    def clear(self):
+        t = time.perf_counter()
+        self._dev.clear()
+        self._log('c', t, None)
+
+    def close(self):
+        # the file is owned and closed by VisaDevice
+        self._file.flush()
+        self._dev.close()
+
+
+class ReplayTransport:
+    """Transport feeding recorded responses from a trace to VisaDevice / SR860.
+
+    Example:
+        lia = SR860(ReplayTransport('run.ndjson', latency='zero'))
+    """
+
+    def __init__(self, path, latency='original', strict=True):
+        """
+        Args:
+            path (str): trace file written with the trace argument of SR860
+            latency (str): 'original' to reproduce the recorded duration of
+                each transaction, 'zero' to replay as fast as possible
+            strict (bool): raise if commands differ from the trace
+        """
+        if latency not in ('original', 'zero'):
+            raise ValueError('Expected str in set: {}.'.format(('original', 'zero')))
+        with open(path) as f:
+            self._records = [json.loads(line) for line in f if line.strip()]
+        self._index = 0
+        self._latency = latency == 'original'
+        self._strict = strict
+        self.timeout = 2000
+
+    @property
+    def remaining(self):
+        """Get number of records not replayed yet.
+
+        Returns:
+            int: number of records
+        """
+        return len(self._records) - self._index
+
+    def _next(self, op, data=None):
+        while self._index < len(self._records):
+            record = self._records[self._index]
+            self._index += 1
+            if record['op'] == op:
+                break
+            if self._strict:
+                raise RuntimeError('Trace mismatch: expected \'{}\' record, got \'{}\'.'.format(record['op'], op))
+        else:
+            raise RuntimeError('Trace exhausted.')
+        if self._strict and data is not None and record['data'] != data:
+            raise RuntimeError('Trace mismatch: expected {!r}, got {!r}.'.format(record['data'], data))
+        if self._latency:
+            time.sleep(record['dt'])
+        return record
+
+    def write(self, data):
+        self._next('w', data)
+
+    def read(self, **kwargs):
+        return self._next('r')['data']
+
+    def read_raw(self):
+        data = self._next('r')['data']
+        return (data if data.endswith('\n') else data + '\n').encode('utf-8')
+
+    def query_binary_values(self, data, datatype='f', is_big_endian=False, container=list):
+        record = self._next('b', data)
+        packed = base64.b64decode(record['b64'])
+        endian = '>' if is_big_endian else '<'
+        if getattr(container, '__module__', None) == 'numpy':
+            # same dtype as pyvisa returns for NumPy containers
+            import numpy as np
+            return np.frombuffer(packed, dtype=endian + record['fmt']).copy()
+        fmt = '{}{}{}'.format(endian, len(packed) // struct.calcsize(record['fmt']), record['fmt'])
+        return container(struct.unpack(fmt, packed))
+
+    def clear(self):
+        self._next('c')
+
+    def close(self):
+        pass
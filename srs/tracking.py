@@ -0,0 +1,140 @@
+import threading
+import time
+
+from .buffers import RingBuffer
+
+
+class ResonanceTracker:
+    """Track a drifting resonance by locking the demodulated phase.
+
+    A PI loop on a dedicated thread reads the XYRP snapshot (SNAPD?) once
+    per period and sets
+
+        frequency = f0 + kp * e + ki * sum(e * dt)
+
+    where e is the phase error in deg, wrapped to [-180, 180), and f0 the
+    frequency at start. The sign of the gains has to match the slope of
+    the phase of the resonance: positive for a phase falling with
+    frequency, as for a driven oscillator. The frequency is written
+    through a CoalescingWriter, so a slow bus never queues stale
+    setpoints. Every update is logged to a ring buffer with the columns:
+
+        time (s, epoch), frequency (Hz), R, P (deg), error (deg)
+
+    Example:
+        with lia.resonance_tracker(kp=0.05, ki=1.) as tracker:
+            time.sleep(60)
+        t, f, R = tracker.log.latest()[:, :3].T
+    """
+
+    columns = ('time', 'frequency', 'R', 'P', 'error')
+
+    def __init__(self, lia, kp, ki, setpoint=None, rate=None, limits=None, capacity=100000):
+        """
+        Args:
+            lia (SR860): lock-in amplifier
+            kp (float): proportional gain in Hz/deg
+            ki (float): integral gain in Hz/(deg s)
+            setpoint (float): phase setpoint in deg, defaults to the phase
+                at start
+            rate (float): update rate in Hz, defaults to one update per
+                SR860.sample_interval(), at most 50 Hz
+            limits (tuple): (min, max) frequency in Hz, the integral is
+                held while the frequency is limited
+            capacity (int): number of updates held in the log
+        """
+        if rate is not None and not rate > 0:
+            raise ValueError('Expected rate > 0 Hz.')
+        self._lia = lia
+        self.kp = kp
+        self.ki = ki
+        self.setpoint = setpoint
+        self._rate = rate
+        self._limits = limits
+        self.log = RingBuffer(capacity, len(self.columns))
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._writer = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @property
+    def frequency(self):
+        """Get the most recently tracked frequency in Hz.
+
+        Returns:
+            float: frequency in Hz, None before the first update
+        """
+        return float(self.log.latest(1)[0, 1]) if self.log.count else None
+
+    def start(self):
+        """Start tracking."""
+        if self._thread is not None and self._thread.is_alive():
+            raise RuntimeError('Tracker is already running.')
+        lia = self._lia
+        rate = self._rate
+        if rate is None:
+            rate = min(1. / lia.sample_interval(), 50.)
+        f0 = lia.frequency
+        if self.setpoint is None:
+            self.setpoint = tuple(lia.XYRP_outputs())[3]
+        lo, hi = self._limits if self._limits is not None else (-float('inf'), float('inf'))
+        f_range = lia.frequency_range
+        if f_range is not None:
+            lo, hi = max(lo, f_range['start Hz']), min(hi, f_range['stop Hz'])
+
+        self.error = None
+        self._stop.clear()
+        self._writer = lia.coalesce(max_rate=rate)
+        self._writer.start()
+        self._thread = threading.Thread(target=self._run, args=(1. / rate, f0, lo, hi), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop tracking, leaving the frequency at the last tracked value.
+
+        Raises:
+            RuntimeError: If tracking failed.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._writer is not None:
+            self._writer.stop()
+            self._writer = None
+        if self.error is not None:
+            raise RuntimeError('Tracking failed.') from self.error
+
+    def _run(self, period, f0, lo, hi):
+        lia, log = self._lia, self.log
+        integral = 0.
+        start = last = time.perf_counter()
+        k = 0
+        try:
+            while not self._stop.is_set():
+                # skip updates that are already due, like Poller
+                k = max(k + 1, int((time.perf_counter() - start) / period))
+                delay = start + k * period - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                X, Y, R, P = lia.XYRP_outputs()
+                now = time.perf_counter()
+                e = (P - self.setpoint + 180.) % 360. - 180.
+                step = integral + e * (now - last)
+                last = now
+                f = f0 + self.kp * e + self.ki * step
+                if lo <= f <= hi:
+                    integral = step
+                else:
+                    # hold the integral while limited (anti-windup)
+                    f = min(max(f, lo), hi)
+                lia.frequency = f
+                log.append((time.time(), f, R, P, e))
+        except Exception as e:
+            self.error = e
@@ -0,0 +1,179 @@
+import os
+
+import numpy as np
+
+
+def _open(path, shape, dtype, fill):
+    """Open a memory-mapped .npy file, creating and filling it if needed."""
+    if os.path.exists(path):
+        data = np.load(path, mmap_mode='r+')
+        if data.shape != shape or data.dtype != np.dtype(dtype):
+            raise ValueError('Existing file {} does not match the store layout.'.format(path))
+        return data
+    data = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+    data[...] = fill
+    return data
+
+
+class TrendStore:
+    """Multi-resolution ring store for long-term trending (RRD-style).
+
+    Raw samples are kept for the most recent raw_capacity samples. Every
+    sample is also folded into min / mean / max buckets of each tier (by
+    default 1 s for a day, 1 min for a week and 1 h for a year). Each tier
+    is a fixed-size ring indexed by bucket number, so memory and disk usage
+    are fixed and a range query at tier resolution is a direct slot lookup.
+    All arrays are memory-mapped .npy files in directory, so the store
+    survives restarts.
+
+    Example:
+        store = TrendStore('trend', channels=2)
+        store.append(time.time(), (R, theta))
+        t, lo, mean, hi = store.query(t0, t1, max_points=2000)
+    """
+
+    def __init__(self, directory, channels, raw_capacity=1000000,
+                 tiers=((1., 86400), (60., 10080), (3600., 8760))):
+        """
+        Args:
+            directory (str): directory of the memory-mapped files
+            channels (int): number of channels
+            raw_capacity (int): number of raw samples kept
+            tiers (tuple): (resolution in s, number of buckets) per tier,
+                finest first
+        """
+        os.makedirs(directory, exist_ok=True)
+        self._raw = _open(os.path.join(directory, 'raw.npy'), (raw_capacity, 1 + channels), 'float64', np.nan)
+        self._raw_count = _open(os.path.join(directory, 'raw_count.npy'), (1,), 'int64', 0)
+        self._tiers = []
+        for resolution, size in sorted(tiers):
+            name = os.path.join(directory, 'tier_{:g}s'.format(resolution))
+            self._tiers.append((
+                resolution,
+                _open(name + '_ids.npy', (size,), 'int64', -1),
+                _open(name + '_count.npy', (size,), 'int64', 0),
+                _open(name + '.npy', (size, 3, channels), 'float64', np.nan),
+                ))
+
+    @property
+    def resolutions(self):
+        """Get tier resolutions in s.
+
+        Returns:
+            tuple: Tuple of float of resolutions in s.
+        """
+        return tuple(tier[0] for tier in self._tiers)
+
+    def append(self, t, values):
+        """Append a sample or block of samples.
+
+        Args:
+            t (float / array_like): time stamp(s) in s, non-decreasing
+            values (array_like): sample (channels,) or block (n, channels)
+        """
+        t = np.atleast_1d(np.asarray(t, dtype=float))
+        values = np.asarray(values, dtype=float).reshape(len(t), -1)
+        if not len(t):
+            return
+
+        # raw ring
+        capacity = len(self._raw)
+        rows = np.column_stack((t, values))[-capacity:]
+        start = int(self._raw_count[0]) % capacity
+        n = min(len(rows), capacity - start)
+        self._raw[start:start + n] = rows[:n]
+        self._raw[:len(rows) - n] = rows[n:]
+        self._raw_count[0] += len(t)
+
+        for resolution, ids, counts, data in self._tiers:
+            buckets = np.floor(t / resolution).astype('int64')
+            index = np.concatenate(([0], np.flatnonzero(np.diff(buckets)) + 1))
+            size = len(ids)
+            # only the last size buckets of a block can be held
+            index = index[-size:]
+            buckets = buckets[index]
+            n = np.diff(np.append(index, len(t)))
+            slots = buckets % size
+
+            # reset slots that still hold an older bucket
+            stale = ids[slots] != buckets
+            stale_slots = slots[stale]
+            ids[stale_slots] = buckets[stale]
+            counts[stale_slots] = 0
+            data[stale_slots, 0] = np.inf
+            data[stale_slots, 1] = 0.
+            data[stale_slots, 2] = -np.inf
+
+            c = counts[slots][:, np.newaxis]
+            total = c + n[:, np.newaxis]
+            bucket_values = values[index[0]:]
+            index = index - index[0]
+            data[slots, 0] = np.minimum(data[slots, 0], np.minimum.reduceat(bucket_values, index, axis=0))
+            data[slots, 1] = (data[slots, 1] * c + np.add.reduceat(bucket_values, index, axis=0)) / total
+            data[slots, 2] = np.maximum(data[slots, 2], np.maximum.reduceat(bucket_values, index, axis=0))
+            counts[slots] += n
+
+    def flush(self):
+        """Write all changes to disk."""
+        for array in [self._raw, self._raw_count] + [a for tier in self._tiers for a in tier[1:]]:
+            array.flush()
+
+    def _raw_range(self, t0, t1):
+        """Raw samples in [t0, t1] in time order."""
+        count = int(self._raw_count[0])
+        capacity = len(self._raw)
+        if count <= capacity:
+            ordered = (self._raw[:count],)
+        else:
+            start = count % capacity
+            ordered = (self._raw[start:], self._raw[:start])
+        parts = []
+        for part in ordered:
+            lo = np.searchsorted(part[:, 0], t0, side='left')
+            hi = np.searchsorted(part[:, 0], t1, side='right')
+            parts.append(part[lo:hi])
+        return np.concatenate(parts)
+
+    def _raw_start(self):
+        count = int(self._raw_count[0])
+        if not count:
+            return np.inf
+        return self._raw[count % len(self._raw) if count > len(self._raw) else 0, 0]
+
+    def query(self, t0, t1, max_points=None):
+        """Get data in the time range [t0, t1] at the finest resolution
+        that covers the range and returns at most max_points points.
+        The coarsest tier is used for ranges older than all tiers.
+
+        Args:
+            t0 (float): start time in s
+            t1 (float): stop time in s
+            max_points (int): maximum number of points, unlimited if None
+
+        Returns:
+            tuple: time stamps (n,) and min, mean, max (n, channels) arrays.
+                Raw samples are returned as min = mean = max. Buckets are
+                time stamped at their start, empty buckets are omitted.
+        """
+        if t0 >= self._raw_start():
+            raw = self._raw_range(t0, t1)
+            if max_points is None or len(raw) <= max_points:
+                values = raw[:, 1:]
+                return raw[:, 0], values, values, values
+
+        for i, (resolution, ids, counts, data) in enumerate(self._tiers):
+            size = len(ids)
+            b0, b1 = int(np.floor(t0 / resolution)), int(np.floor(t1 / resolution))
+            newest = ids.max()
+            coarsest = i == len(self._tiers) - 1
+            too_old = b0 <= newest - size
+            too_many = max_points is not None and b1 - b0 + 1 > max_points
+            if too_many or (too_old and not coarsest):
+                continue
+            buckets = np.arange(max(b0, newest - size + 1), b1 + 1)
+            slots = buckets % size
+            valid = ids[slots] == buckets
+            buckets, slots = buckets[valid], slots[valid]
+            return buckets * resolution, data[slots, 0], data[slots, 1], data[slots, 2]
+
+        raise ValueError('No tier covers the range with at most {} points.'.format(max_points))
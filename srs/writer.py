@@ -0,0 +1,209 @@
+import json
+import queue
+import threading
+import time
+
+import numpy as np
+
+try:
+    import h5py
+except ImportError:
+    h5py = None
+
+
+class _HDF5File:
+    """Chunked, compressed, resizable HDF5 dataset."""
+
+    def __init__(self, path, channels, dtype, chunk_rows, compression, capacity=None):
+        if h5py is None:
+            raise ImportError('HDF5 files require the h5py package.')
+        self._file = h5py.File(path, 'w')
+        self._data = self._file.create_dataset(
+            'data', shape=(0, channels), maxshape=(None, channels), dtype=dtype,
+            chunks=(chunk_rows, channels), compression=compression)
+        self.rows = 0
+
+    def set_attrs(self, attrs):
+        self._data.attrs.update(attrs)
+
+    def append(self, block):
+        rows = self.rows + len(block)
+        self._data.resize(rows, axis=0)
+        self._data[self.rows:rows] = block
+        self.rows = rows
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class _NPYFile:
+    """Pre-allocated memory-mapped .npy file. The number of rows written
+    and the attributes are kept in a JSON sidecar file (path + '.json')."""
+
+    def __init__(self, path, channels, dtype, chunk_rows, compression, capacity=None):
+        if capacity is None:
+            raise ValueError('Expected capacity (number of rows) for .npy files.')
+        self._path = path
+        self._data = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=(capacity, channels))
+        self._attrs = {}
+        self.rows = 0
+
+    def set_attrs(self, attrs):
+        self._attrs.update(attrs)
+        self._write_sidecar()
+
+    def append(self, block):
+        rows = self.rows + len(block)
+        if rows > len(self._data):
+            raise RuntimeError('File capacity of {} rows exceeded.'.format(len(self._data)))
+        self._data[self.rows:rows] = block
+        self.rows = rows
+
+    def _write_sidecar(self):
+        with open(self._path + '.json', 'w') as f:
+            json.dump({'rows': self.rows, 'attrs': self._attrs}, f)
+
+    def flush(self):
+        self._data.flush()
+        self._write_sidecar()
+
+    def close(self):
+        self.flush()
+        del self._data
+
+
+class SampleWriter:
+    """Append acquired blocks to a chunked file on a background thread.
+
+    Blocks are copied and queued by append(), so acquisition loops never
+    wait for the disk. The writer thread collects queued blocks and writes
+    them out once flush_rows rows are pending or flush_interval seconds
+    have passed. The file type is chosen from the extension: '.h5' /
+    '.hdf5' (chunked, compressed HDF5 dataset 'data', requires h5py) or
+    '.npy' (pre-allocated memory-mapped array of capacity rows).
+
+    Example:
+        with SampleWriter('run.h5', 4, attrs=lia.settings_snapshot()) as w:
+            while running:
+                w.append(tuple(lia.XYRP_outputs()))
+    """
+
+    _files = {'.h5': _HDF5File, '.hdf5': _HDF5File, '.npy': _NPYFile}
+
+    def __init__(self, path, channels, capacity=None, dtype='float64', attrs=None,
+                 chunk_rows=4096, compression='gzip', flush_interval=1.0, flush_rows=65536,
+                 max_pending=1024):
+        """
+        Args:
+            path (str): file path ending in .h5, .hdf5 or .npy
+            channels (int): number of channels (columns)
+            capacity (int): number of rows to pre-allocate (.npy only)
+            dtype (str): sample data type
+            attrs (dict): attributes, e.g. SR860.settings_snapshot()
+            chunk_rows (int): HDF5 chunk size in rows
+            compression (str): HDF5 compression filter
+            flush_interval (float): maximum time in s between flushes
+            flush_rows (int): maximum number of rows pending before a flush
+            max_pending (int): maximum number of queued blocks before
+                append() blocks
+        """
+        for ext, cls in self._files.items():
+            if path.endswith(ext):
+                break
+        else:
+            raise ValueError('Expected file extension in set: {}.'.format(tuple(self._files)))
+
+        self._file = cls(path, channels, dtype, chunk_rows, compression, capacity)
+        if attrs:
+            self._file.set_attrs(attrs)
+        self._channels = channels
+        self._dtype = dtype
+        self._flush_interval = flush_interval
+        self._flush_rows = flush_rows
+        self._queue = queue.Queue(max_pending)
+        self._error = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def rows(self):
+        """Get number of rows written to the file.
+
+        Returns:
+            int: number of rows
+        """
+        return self._file.rows
+
+    def append(self, block):
+        """Queue a sample or block of samples for writing.
+
+        Args:
+            block (array_like): sample (channels,) or block (n, channels)
+
+        Raises:
+            RuntimeError: If the writer thread failed or was closed.
+        """
+        block = np.array(block, dtype=self._dtype, ndmin=2)
+        if block.shape[1] != self._channels:
+            raise ValueError('Expected {} channels.'.format(self._channels))
+        while True:
+            if self._error is not None:
+                raise RuntimeError('Writer failed.') from self._error
+            if not self._thread.is_alive():
+                raise RuntimeError('Writer has been closed.')
+            try:
+                self._queue.put(block, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def close(self):
+        """Write all queued blocks and close the file.
+
+        Raises:
+            RuntimeError: If the writer thread failed.
+        """
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self._error is not None:
+            raise RuntimeError('Writer failed.') from self._error
+
+    def _run(self):
+        pending, rows = [], 0
+        deadline = time.monotonic() + self._flush_interval
+        closing = False
+        try:
+            while not closing:
+                try:
+                    block = self._queue.get(timeout=max(deadline - time.monotonic(), 0.))
+                except queue.Empty:
+                    block = ()
+                if block is None:
+                    closing = True
+                elif len(block):
+                    pending.append(block)
+                    rows += len(block)
+                    if rows < self._flush_rows and time.monotonic() < deadline:
+                        continue
+                elif time.monotonic() < deadline:
+                    continue
+
+                if pending:
+                    self._file.append(np.concatenate(pending))
+                    self._file.flush()
+                    pending, rows = [], 0
+                deadline = time.monotonic() + self._flush_interval
+        except Exception as e:
+            self._error = e
+        finally:
+            self._file.close()
@@ -0,0 +1,42 @@
+import numpy as np
+
+from srs.buffers import RingBuffer
+
+
+def test_append_and_latest():
+    buffer = RingBuffer(4, 2)
+    for i in range(6):
+        buffer.append((i, -i))
+    assert buffer.count == 6
+    assert len(buffer) == 4
+    np.testing.assert_array_equal(buffer.latest()[:, 0], [2, 3, 4, 5])
+    np.testing.assert_array_equal(buffer.latest(2)[:, 1], [-4, -5])
+
+
+def test_extend_wraps():
+    buffer = RingBuffer(4, 1)
+    buffer.extend(np.arange(3)[:, np.newaxis])
+    buffer.extend(np.arange(3, 6)[:, np.newaxis])
+    assert buffer.count == 6
+    np.testing.assert_array_equal(buffer.latest()[:, 0], [2, 3, 4, 5])
+
+
+def test_extend_larger_than_capacity_counts_all_rows():
+    buffer = RingBuffer(4, 1)
+    buffer.append((-1,))
+    buffer.extend(np.arange(10)[:, np.newaxis])
+    assert buffer.count == 11
+    np.testing.assert_array_equal(buffer.latest()[:, 0], [6, 7, 8, 9])
+    buffer.append((10,))
+    np.testing.assert_array_equal(buffer.latest()[:, 0], [7, 8, 9, 10])
+
+
+def test_since_skips_overwritten_rows():
+    buffer = RingBuffer(4, 1)
+    buffer.extend(np.arange(3)[:, np.newaxis])
+    count = buffer.count
+    buffer.extend(np.arange(3, 10)[:, np.newaxis])
+    new = buffer.since(count)
+    assert buffer.count - count == 7
+    np.testing.assert_array_equal(new[:, 0], [6, 7, 8, 9])
+    np.testing.assert_array_equal(buffer.since(buffer.count - 2, buffer.count - 1)[:, 0], [8])